@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def default_cache_dir() -> str:
+    if path := os.environ.get('FARSA_CACHE_DIR'):
+        return path
+    return os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~/.cache'), 'farsa')
+
+
+def module_identity(pe) -> tuple[int, int, int]:
+    return pe.FILE_HEADER.TimeDateStamp, pe.OPTIONAL_HEADER.SizeOfImage, pe.OPTIONAL_HEADER.CheckSum
+
+
+def sig_hash(sig: str, scope: str = '') -> str:
+    # scope is the section selection the signature was searched in, see pattern.section_scope
+    res = hashlib.sha1(' '.join(sig.split()).upper().encode()).hexdigest()
+    return f'{res}@{scope}' if scope else res
+
+
+class ModuleCache:
+    sig_file_name = 'sigs.json'
+
+    def __init__(self, pe, module_name: str, cache_dir: str = None):
+        time_date_stamp, size_of_image, checksum = module_identity(pe)
+        self.dir = os.path.join(
+            cache_dir or default_cache_dir(),
+            f'{module_name}_{time_date_stamp:08X}_{size_of_image:X}_{checksum:08X}'
+        )
+        self._sigs = None
+        self._dirty = False
+
+    def path(self, file_name: str) -> str:
+        os.makedirs(self.dir, exist_ok=True)
+        return os.path.join(self.dir, file_name)
+
+    def load_json(self, file_name: str, default=None):
+        try:
+            with open(os.path.join(self.dir, file_name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def save_json(self, file_name: str, data):
+        path = self.path(file_name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load_arrays(self, file_name: str) -> dict | None:
+        # numpy arrays saved by save_arrays, None if missing or broken
+        try:
+            with np.load(os.path.join(self.dir, file_name)) as f:
+                return {k: f[k] for k in f.files}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_arrays(self, file_name: str, arrays: dict):
+        path = self.path(file_name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @property
+    def sigs(self) -> dict[str, list]:
+        if self._sigs is None:
+            self._sigs = self.load_json(self.sig_file_name, {})
+        return self._sigs
+
+    def get_sig(self, sig: str, scope: str = '') -> list[tuple[int, list[int]]] | None:
+        # cached search_from_text result with rva instead of address
+        if (res := self.sigs.get(sig_hash(sig, scope))) is not None:
+            return [(rva, offsets) for rva, offsets in res]
+
+    def set_sig(self, sig: str, res: list[tuple[int, list[int]]], scope: str = ''):
+        self.sigs[sig_hash(sig, scope)] = [[rva, offsets] for rva, offsets in res]
+        self._dirty = True
+
+    def save(self):
+        if self._dirty:
+            self.save_json(self.sig_file_name, self.sigs)
+            self._dirty = False
@@ -1,10 +1,10 @@
-from ctypes import windll
+import ctypes
 
 
 class WinAPIError(Exception):
     def __init__(self, error_code=None, func_name=None):
         if error_code is None:
-            self.error_code = windll.kernel32.GetLastError()
+            self.error_code = ctypes.windll.kernel32.GetLastError()
         else:
             self.error_code = error_code
         if func_name:
@@ -12,3 +12,12 @@ class WinAPIError(Exception):
         else:
             message = f'Windows api error, error_code: {self.error_code:#X}'
         super(WinAPIError, self).__init__(message)
+
+
+class MemoryAccessError(WinAPIError):
+    # failed access of a non winapi memory source, a WinAPIError so the callers handle every source the same way
+    def __init__(self, address: int, size: int, func_name: str, error_code: int = 0):
+        self.address = address
+        self.size = size
+        self.error_code = error_code
+        Exception.__init__(self, f'Memory access error at calling {func_name} on {address:#X}+{size:#X}, error_code: {error_code:#X}')
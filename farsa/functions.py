@@ -0,0 +1,79 @@
+import bisect
+from array import array
+
+IMAGE_DIRECTORY_ENTRY_EXCEPTION = 3
+UNW_FLAG_CHAININFO = 4
+RUNTIME_FUNCTION_SIZE = 12
+
+
+def rva_reader(pe):
+    # read(rva, size) over the raw sections of the pe, without the per call section lookup of pe.get_data
+    data = pe.__data__
+    sections = sorted((sect.VirtualAddress, sect.PointerToRawData, sect.SizeOfRawData) for sect in pe.sections)
+    starts = [va for va, offset, size in sections]
+
+    def read(rva: int, size: int) -> bytes:
+        if (i := bisect.bisect_right(starts, rva) - 1) < 0: return b''
+        va, offset, raw_size = sections[i]
+        return data[offset + rva - va:offset + min(rva - va + size, raw_size)] if rva - va < raw_size else b''
+
+    return read
+
+
+def chain_parent(read, begin: int, unwind: int) -> int:
+    # begin rva of the entry an entry is chained to, or its own begin
+    if unwind & 1: return int.from_bytes(read(unwind & ~1, 4), 'little') or begin
+    header = read(unwind, 4)
+    if len(header) < 4 or not (header[0] >> 3) & UNW_FLAG_CHAININFO: return begin
+    return int.from_bytes(read(unwind + 4 + 2 * ((header[2] + 1) & ~1), 4), 'little') or begin
+
+
+class FunctionIndex:
+    # begin / end rva of the RUNTIME_FUNCTION entries of the exception directory (.pdata) and the begin of the entry
+    # each one is chained to, kept as flat sorted arrays for bisect instead of the parsed structures
+    def __init__(self, begins: array, ends: array, parents: array):
+        self.begins = begins
+        self.ends = ends
+        self.parents = parents
+
+    @classmethod
+    def from_pe(cls, pe):
+        # the raw table read at once, same entries as pe.parse_exceptions_directory gives on x64;
+        # the chains are resolved here so the index does not need the pe after
+        directory = pe.OPTIONAL_HEADER.DATA_DIRECTORY[IMAGE_DIRECTORY_ENTRY_EXCEPTION]
+        entries = array('I')
+        if directory.VirtualAddress and directory.Size:
+            data = pe.get_data(directory.VirtualAddress, directory.Size)
+            entries.frombytes(data[:len(data) // RUNTIME_FUNCTION_SIZE * RUNTIME_FUNCTION_SIZE])
+        begins, ends, unwind = entries[0::3], entries[1::3], entries[2::3]
+        if any(begins[i] > begins[i + 1] for i in range(len(begins) - 1)):
+            order = sorted(range(len(begins)), key=begins.__getitem__)
+            begins, ends, unwind = (array('I', (a[i] for i in order)) for a in (begins, ends, unwind))
+        read = rva_reader(pe)
+        return cls(begins, ends, array('I', (chain_parent(read, begin, u) for begin, u in zip(begins, unwind))))
+
+    def __len__(self):
+        return len(self.begins)
+
+    def index(self, rva: int) -> int:
+        # index of the entry contains rva, -1 if none
+        i = bisect.bisect_right(self.begins, rva) - 1
+        return i if i >= 0 and rva < self.ends[i] else -1
+
+    def find(self, rva: int) -> tuple[int, int] | None:
+        # (begin, end) of the entry contains rva, it may be a chained fragment of a function
+        if (i := self.index(rva)) < 0: return None
+        return self.begins[i], self.ends[i]
+
+    def parent(self, i: int) -> int:
+        # begin rva of the entry that entry i is chained to, or its own begin
+        return self.parents[i]
+
+    def function_start(self, rva: int) -> int | None:
+        # begin rva of the function contains rva, chained fragments resolved to their primary entry
+        if (i := self.index(rva)) < 0: return None
+        for _ in range(32):
+            if (begin := self.parent(i)) == self.begins[i]: break
+            if (j := self.index(begin)) < 0: break
+            i = j
+        return self.begins[i]
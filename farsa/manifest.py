@@ -0,0 +1,122 @@
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import sys
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from .pefile import PE
+from .pattern import StaticPatternSearcher
+
+UNIQUE = 'unique'
+AMBIGUOUS = 'ambiguous'
+MISSING = 'missing'
+
+
+def load_manifest(path: str) -> dict[str, str]:
+    # json object of {name: signature}
+    with open(path, 'r', encoding='utf-8') as f:
+        res = json.load(f)
+    if not isinstance(res, dict) or not all(isinstance(v, str) for v in res.values()):
+        raise ValueError(f'{path} is not a json object of name to signature')
+    return res
+
+
+def iter_files(directory: str, pattern: str = '*'):
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and fnmatch.fnmatch(name, pattern):
+            yield path
+
+
+def resolve_file(
+        file_path: str,
+        patterns: dict[str, str],
+        sections: str | list[str] = None,
+        characteristics: int = None,
+) -> dict:
+    # one row of the match matrix: the status of every signature in the file, with the rva and the points of unique ones
+    try:
+        pe = PE(file_path, fast_load=True)
+    except Exception as e:
+        return {'file': file_path, 'error': f'{type(e).__name__}: {e}'}
+    try:
+        scanner = StaticPatternSearcher(pe, sections=sections, characteristics=characteristics)
+        results = {}
+        # two hits are enough to tell a signature is ambiguous
+        for name, matches in scanner.search_many(patterns, limit=2).items():
+            if not matches:
+                results[name] = {'status': MISSING}
+            elif len(matches) > 1:
+                results[name] = {'status': AMBIGUOUS}
+            else:
+                rva, offsets = matches[0]
+                results[name] = {'status': UNIQUE, 'rva': rva, 'points': [rva + offset for offset in offsets]}
+        return {'file': file_path, 'results': results}
+    finally:
+        pe.close()
+
+
+def iter_resolve(
+        patterns: dict[str, str],
+        files: typing.Iterable[str],
+        workers: int = None,
+        sections: str | list[str] = None,
+        characteristics: int = None,
+):
+    # yield resolve_file of each file in order, the files are resolved in a process pool
+    files = list(files)
+    if workers == 1 or len(files) <= 1:
+        for file_path in files:
+            yield resolve_file(file_path, patterns, sections, characteristics)
+        return
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(resolve_file, file_path, patterns, sections, characteristics) for file_path in files]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def resolve_to(stream: typing.TextIO, patterns: dict[str, str], files: typing.Iterable[str], **kwargs):
+    # write each row as a json line once it is resolved, returns the count of the rows by status
+    summary = {UNIQUE: 0, AMBIGUOUS: 0, MISSING: 0, 'error': 0}
+    for row in iter_resolve(patterns, files, **kwargs):
+        stream.write(json.dumps(row) + '\n')
+        stream.flush()
+        if 'error' in row:
+            summary['error'] += 1
+        else:
+            for res in row['results'].values():
+                summary[res['status']] += 1
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='farsa.manifest', description='resolve a signature manifest in every pe file of a directory')
+    parser.add_argument('manifest', help='json object of {name: signature}')
+    parser.add_argument('directory', help='directory of the pe files')
+    parser.add_argument('-g', '--glob', default='*', help='file name pattern of the pe files, default *')
+    parser.add_argument('-o', '--output', help='json lines output file, default stdout')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, default cpu count')
+    parser.add_argument('-s', '--sections', nargs='+', default=None, help='section name globs to scan, default .text')
+    parser.add_argument('-c', '--characteristics', type=lambda v: int(v, 0), default=None, help='required section characteristics flags')
+    args = parser.parse_args(argv)
+
+    patterns = load_manifest(args.manifest)
+    files = iter_files(args.directory, args.glob)
+    kwargs = dict(workers=args.workers, sections=args.sections, characteristics=args.characteristics)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            summary = resolve_to(f, patterns, files, **kwargs)
+    else:
+        summary = resolve_to(sys.stdout, patterns, files, **kwargs)
+    print(', '.join(f'{k}: {v}' for k, v in summary.items()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
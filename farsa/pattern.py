@@ -1,4 +1,24 @@
+import fnmatch
+import heapq
+import itertools
+import mmap
+import multiprocessing
 import re
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from .exception import WinAPIError
+from .utils import memory, source
+
+try:
+    from .winapi import kernel32
+except Exception:
+    kernel32 = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 def wild_card(count: int):
@@ -10,15 +30,32 @@ def wild_card(count: int):
     return ans
 
 
+def sig_tokens(sig: str):
+    return [s for s in sig.strip().split(' ') if s]
+
+
+def sig_byte(s: str):
+    # (value, mask) of a signature token, `?` / `??` is a full wildcard, `4?` / `?8` are nibble wildcards
+    if s.startswith('*') or s == '?' or s == '??':
+        return 0, 0
+    if s[0] == '?':
+        return int(s[1], 16), 0x0F
+    if s[-1] == '?':
+        return int(s[0], 16) << 4, 0xF0
+    return int(s, 16), 0xFF
+
+
+def escape_byte(b: int):
+    return bytes((0x5c, b)) if b in special_chars_map else bytes((b,))
+
+
 def sig_to_pattern(sig: str):
     ans = bytearray()
     flag1 = False
     wild_card_counter = 0
     offset = []
     i = 0
-    for i, s in enumerate(sig.strip().split(' ')):
-        if not s:
-            continue
+    for i, s in enumerate(sig_tokens(sig)):
         if s.startswith('*'):
             if not flag1:
                 ans += wild_card(wild_card_counter)
@@ -31,16 +68,17 @@ def sig_to_pattern(sig: str):
             ans += b')'
             flag1 = False
             offset.append(i)
-        if flag1 or s.startswith('?'):
+        value, mask = sig_byte(s)
+        if flag1 or not mask:
             wild_card_counter += 1
         else:
             if wild_card_counter:
                 ans += wild_card(wild_card_counter)
                 wild_card_counter = 0
-            temp = int(s, 16)
-            if temp in special_chars_map:
-                ans += b'\\'
-            ans.append(temp)
+            if mask == 0xFF:
+                ans += escape_byte(value)
+            else:
+                ans += b'[' + b''.join(escape_byte(b) for b in range(256) if b & mask == value) + b']'
     ans += wild_card(wild_card_counter)
     if flag1:
         ans += b')'
@@ -48,44 +86,589 @@ def sig_to_pattern(sig: str):
     return bytes(ans), offset
 
 
+def parse_sig(sig: str):
+    # values, masks and the (start, end) spans of the `*` groups of a signature
+    values = bytearray()
+    masks = bytearray()
+    groups = []
+    group_start = None
+    tokens = sig_tokens(sig)
+    for i, s in enumerate(tokens):
+        if s.startswith('*'):
+            if group_start is None: group_start = i
+        elif group_start is not None:
+            groups.append((group_start, i))
+            group_start = None
+        value, mask = sig_byte(s)
+        values.append(value)
+        masks.append(mask)
+    if group_start is not None: groups.append((group_start, len(tokens)))
+    return bytes(values), bytes(masks), groups
+
+
+def sig_length(sig: str):
+    return len(sig_tokens(sig))
+
+
+def sig_anchor(sig: str):
+    # the longest literal run of the signature as (offset, bytes)
+    anchor_offset, anchor = 0, b''
+    run_offset, run = 0, bytearray()
+    for i, s in enumerate(sig_tokens(sig)):
+        value, mask = sig_byte(s)
+        if mask != 0xFF:
+            run_offset, run = i + 1, bytearray()
+            continue
+        run.append(value)
+        if len(run) > len(anchor):
+            anchor_offset, anchor = run_offset, bytes(run)
+    return anchor_offset, anchor
+
+
+def sig_scan_anchor(sig: str):
+    # the anchor when jumping with bytes.find pays off, else None; re already skips to a leading literal itself,
+    # so the anchor has to be clearly longer than that prefix, and a single byte anchor is slower than re
+    prefix = 0
+    for s in sig_tokens(sig):
+        if sig_byte(s)[1] != 0xFF: break
+        prefix += 1
+    anchor_offset, anchor = sig_anchor(sig)
+    if len(anchor) < max(2, prefix + 2): return None
+    return anchor_offset, anchor
+
+
+class MaskedMatch:
+    __slots__ = ('string', '_start', '_end', '_groups')
+
+    def __init__(self, string, start: int, end: int, groups: list[tuple[int, int]]):
+        self.string = string
+        self._start = start
+        self._end = end
+        self._groups = groups
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def span(self):
+        return self._start, self._end
+
+    def groups(self):
+        return tuple(bytes(self.string[self._start + a:self._start + b]) for a, b in self._groups)
+
+
+class MaskedPattern:
+    # bytes seen too often in code to be a good first filter
+    common_bytes = {0x00, 0xff, 0xcc, 0x48, 0x89, 0x8b, 0x0f, 0x83, 0x4c, 0x24, 0xe8}
+    block_size = 0x1000000
+
+    def __init__(self, sig: str):
+        if np is None: raise ImportError('numpy is required by the numpy engine')
+        self.values, self.masks, self._groups = parse_sig(sig)
+        self.size = len(self.values)
+        self.groups = len(self._groups)
+        self.order = sorted(
+            (i for i in range(self.size) if self.masks[i]),
+            key=lambda i: (self.masks[i] != 0xFF, self.values[i] in self.common_bytes)
+        )
+
+    def iter_candidates(self, arr, start: int, count: int):
+        candidates = None
+        for i in self.order:
+            value, mask = self.values[i], self.masks[i]
+            col = arr[start + i:start + i + count] if candidates is None else arr[candidates + i]
+            hit = col == value if mask == 0xFF else (col & mask) == value
+            candidates = np.flatnonzero(hit) + start if candidates is None else candidates[hit]
+            if not len(candidates): return []
+        return range(start, start + count) if candidates is None else candidates.tolist()
+
+    def finditer(self, data, pos=0, endpos=None, overlapped=False):
+        arr = np.frombuffer(data, dtype=np.uint8)
+        if endpos is None or endpos > len(arr): endpos = len(arr)
+        last = endpos - self.size + 1
+        last_end = pos
+        for start in range(pos, last, self.block_size):
+            for i in self.iter_candidates(arr, start, min(self.block_size, last - start)):
+                if i < last_end: continue
+                if not overlapped: last_end = i + self.size
+                yield MaskedMatch(data, i, i + self.size, self._groups)
+
+
+def iter_pattern(pattern: re.Pattern | MaskedPattern, data, pos=0, endpos=None, anchor: tuple[int, bytes] = None, overlapped=False):
+    # same as pattern.finditer, but jump between the anchor occurrences with bytes.find when it is given,
+    # and yield every match start instead of the non-overlapping ones when overlapped
+    if endpos is None: endpos = len(data)
+    if isinstance(pattern, MaskedPattern):
+        yield from pattern.finditer(data, pos, endpos, overlapped)
+    elif anchor and anchor[1]:
+        anchor_offset, anchor = anchor
+        find = data.find
+        match_ = pattern.match
+        i = find(anchor, pos + anchor_offset, endpos)
+        while i != -1:
+            if (match := match_(data, i - anchor_offset, endpos)) and not overlapped:
+                yield match
+                i = find(anchor, match.end() + anchor_offset, endpos)
+                continue
+            if match: yield match
+            i = find(anchor, i + 1, endpos)
+    elif overlapped:
+        search = pattern.search
+        while match := search(data, pos, endpos):
+            yield match
+            pos = match.start() + 1
+    else:
+        yield from pattern.finditer(data, pos, endpos)
+
+
+def non_overlapping(matches):
+    # (start, end, groups) with every match start -> (start, groups) a re.finditer would give
+    last_end = -1
+    for start, end, groups in matches:
+        if start < last_end: continue
+        last_end = end
+        yield start, groups
+
+
+def compile_pattern(pattern: bytes | re.Pattern | MaskedPattern):
+    return re.compile(bytes(pattern)) if isinstance(pattern, (bytes, bytearray)) else pattern
+
+
 special_chars_map = {i for i in b'()[]{}?*+-|^$\\.&~# \t\n\r\v\f'}
 
 
-class StaticPatternSearcher:
-    def __init__(self, pe, base_address=0):
-        self.pe = pe
-        self.text_sections = [sect for sect in self.pe.sections if sect.Name.rstrip(b'\0') == b'.text']
-        self.section_datas = [sect.get_data() for sect in self.text_sections]
-        self.section_virtual_addresses = [sect.VirtualAddress for sect in self.text_sections]
-        self.base_address = base_address
+def group_values(groups):
+    return [int.from_bytes(g, byteorder='little', signed=True) for g in groups]
+
+
+class MultiPattern:
+    # signatures scanned each with its own anchored pattern over the same data, a signature repeated is scanned once;
+    # the hits are merged in address order and tagged with the index of the signature
+    def __init__(self, patterns: dict[str, str]):
+        self.names = list(patterns)
+        self.sigs = [patterns[name] for name in self.names]
+        self.offsets = []
+        self.lengths = []
+        self.patterns = []
+        self.anchors = []
+        self.same_sigs = {}  # first index of a signature -> indexes of all its names
+        first_index = {}
+        for i, sig in enumerate(self.sigs):
+            _pattern, offsets = sig_to_pattern(sig)
+            self.offsets.append(offsets)
+            self.lengths.append(sig_length(sig))
+            self.patterns.append(re.compile(_pattern))
+            self.anchors.append(sig_scan_anchor(sig))
+            self.same_sigs.setdefault(first_index.setdefault(sig, i), []).append(i)
+
+    def resolve(self, idx: int, address: int, groups: list[int]):
+        # (name, address, offsets) like search_from_text from the group values of a match
+        return self.names[idx], address, [g + self.offsets[idx][i] for i, g in enumerate(groups)]
+
+    def _scan(self, i: int, data, pos: int, endpos: int, overlapped: bool):
+        for match in iter_pattern(self.patterns[i], data, pos, endpos, self.anchors[i], overlapped):
+            yield match.start(), i, match.end(), match.groups()
+
+    def iter_matches(self, data, pos=0, endpos=None, overlapped=False, starts: list[int] = None):
+        # yield every (idx, start, end, groups) ordered by start, the matches of each signature are those of its
+        # re.finditer from starts[idx] (default pos), or all the overlapping ones with overlapped
+        if endpos is None: endpos = len(data)
+        scans = [
+            self._scan(i, data, pos if starts is None else max(pos, starts[i]), endpos, overlapped)
+            for i in self.same_sigs
+        ]
+        for start, i, end, groups in heapq.merge(*scans):
+            for idx in self.same_sigs[i]:
+                yield idx, start, end, groups
+
+    def select(self, matches, pos_limit=None, last_end=None):
+        # yield (idx, start, groups) of only the matches a separated re.finditer of each signature would give
+        if last_end is None: last_end = [-1] * len(self.names)
+        for idx, start, end, groups in matches:
+            if pos_limit is not None and start >= pos_limit: break
+            if start < last_end[idx]: continue
+            last_end[idx] = end
+            yield idx, start, groups
+
+    def search(self, data, pos=0, endpos=None, pos_limit=None, last_end=None):
+        res = [[] for _ in self.names]
+        for idx, start, groups in self.select(self.iter_matches(data, pos, endpos), pos_limit, last_end):
+            res[idx].append((start, groups))
+        return res
+
 
-    def search_raw_pattern(self, pattern: bytes):
-        res = []
-        for i in range(len(self.text_sections)):
-            va = self.section_virtual_addresses[i]
-            res.extend(
-                (
-                    match.span()[0] + va + self.base_address,
-                    [int.from_bytes(g, byteorder='little', signed=True) for g in match.groups()]
-                ) for match in re.finditer(bytes(pattern), self.section_datas[i])
-            )
+def chunk_matches(pattern: re.Pattern | MaskedPattern | MultiPattern, anchor, data, pos: int, limit: int, endpos: int):
+    # every match starts in [pos, limit) as (start, end, groups), or (idx, start, end, groups) of a MultiPattern
+    res = []
+    if isinstance(pattern, MultiPattern):
+        matches = pattern.iter_matches(data, pos, endpos, True)
+        try:
+            for match in matches:
+                if match[1] >= limit: break
+                res.append(match)
+        finally:
+            matches.close()
+    else:
+        matches = iter_pattern(pattern, data, pos, endpos, anchor, True)
+        try:
+            for match in matches:
+                if match.start() >= limit: break
+                res.append((match.start(), match.end(), match.groups()))
+        finally:
+            matches.close()
+    return res
+
+
+def iter_futures(futures):
+    # yield the results of the futures in order, cancel the rest when stopped early
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def scan_file_chunk(file_path: str, pattern, anchor, pos: int, limit: int, endpos: int):
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return chunk_matches(pattern, anchor, data, pos, limit, endpos)
+
+
+def scan_process_chunk(reopen_args, pattern, anchor, address: int, limit: int, endpos: int):
+    factory, args = reopen_args
+    _source = factory(*args)
+    try:
+        data = memory.read_bytes(_source, address, endpos - address)
+    except WinAPIError:
+        return []
+    finally:
+        _source.close()
+    res = chunk_matches(pattern, anchor, data, 0, limit - address, len(data))
+    if isinstance(pattern, MultiPattern):
+        return [(idx, start + address, end + address, groups) for idx, start, end, groups in res]
+    return [(start + address, end + address, groups) for start, end, groups in res]
+
+
+SCN_CNT_CODE = 0x20
+SCN_CNT_INITIALIZED_DATA = 0x40
+SCN_MEM_EXECUTE = 0x20000000
+SCN_MEM_READ = 0x40000000
+SCN_MEM_WRITE = 0x80000000
+
+
+class SectionRange(typing.NamedTuple):
+    name: str
+    virtual_address: int
+    offset: int  # file offset, the same range as sect.get_data()
+    size: int
+
+
+def section_ranges(pe, names: str | typing.Iterable[str] = None, characteristics: int = 0) -> list[SectionRange]:
+    # sections whose name matches one of the globs and which have all the characteristics flags
+    if isinstance(names, str): names = (names,)
+    res = []
+    for sect in pe.sections:
+        name = sect.Name.rstrip(b'\0').decode('latin-1')
+        if names is not None and not any(fnmatch.fnmatchcase(name, n) for n in names): continue
+        if sect.Characteristics & characteristics != characteristics: continue
+        offset = sect.get_PointerToRawData_adj()
+        end = min(sect.PointerToRawData + sect.SizeOfRawData, len(pe.__data__))
+        res.append(SectionRange(name, sect.VirtualAddress, offset, max(end - offset, 0)))
+    return res
+
+
+def section_scope(names: str | typing.Iterable[str] = None, characteristics: int = None) -> str:
+    # key of a section selection, empty for the default .text only selection
+    if names is None and characteristics is None: return ''
+    if isinstance(names, str): names = (names,)
+    return f'{",".join(names) if names is not None else "*"}:{characteristics or 0:08X}'
+
+
+class PatternSearcher:
+    engines = ('regex', 'numpy')
+    engine = 'regex'
+    default_max_length = 0x100
+    workers = 0
+    _executor = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # fork with the pool threads running may deadlock the workers, spawn them like on windows
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def compile_sig(self, sig: str):
+        # (pattern, anchor) of the signature for the engine of the searcher
+        if self.engine == 'numpy':
+            return MaskedPattern(sig), None
+        return re.compile(sig_to_pattern(sig)[0]), sig_scan_anchor(sig)
+
+    def iter_raw_pattern(self, pattern: bytes | re.Pattern | MaskedPattern, anchor: tuple[int, bytes] = None, max_length: int = None) -> typing.Iterator[tuple[int, list[int]]]:
+        raise NotImplementedError()
+
+    def iter_raw_many(self, multi: MultiPattern) -> typing.Iterator[tuple[int, int, list[int]]]:
+        # yield (idx, address, groups) of all signatures in scan order
+        raise NotImplementedError()
+
+    def search_raw_pattern(self, pattern: bytes | re.Pattern | MaskedPattern, anchor: tuple[int, bytes] = None, max_length: int = None):
+        return list(self.iter_raw_pattern(pattern, anchor, max_length))
+
+    def search_raw_many(self, multi: MultiPattern, limit: int = None):
+        res = [[] for _ in multi.names]
+        if limit is not None and limit <= 0: return res
+        full = 0
+        for idx, address, groups in self.iter_raw_many(multi):
+            if limit is not None:
+                if len(res[idx]) >= limit: continue
+                if len(res[idx]) == limit - 1:
+                    full += 1
+            res[idx].append((address, groups))
+            if full == len(res): break
         return res
 
+    def iter_from_text(self, pattern: str):
+        offsets = sig_to_pattern(pattern)[1]
+        for address, groups in self.iter_raw_pattern(*self.compile_sig(pattern), max_length=sig_length(pattern)):
+            yield address, [g + offsets[i] for i, g in enumerate(groups)]
+
+    def iter_address(self, pattern: str):
+        for address, offsets in self.iter_from_text(pattern):
+            yield address
+
+    def iter_point(self, pattern: str):
+        for address, offsets in self.iter_from_text(pattern):
+            yield [address + offset for offset in offsets]
+
+    def iter_val(self, pattern: str):
+        return self.iter_raw_pattern(*self.compile_sig(pattern), max_length=sig_length(pattern))
+
     def search_from_text(self, pattern: str):
-        _pattern, offsets = sig_to_pattern(pattern)
-        return [(
-            address, [g + offsets[i] for i, g in enumerate(groups)]
-        ) for address, groups in self.search_raw_pattern(_pattern)]
+        return list(self.iter_from_text(pattern))
 
     def find_address(self, pattern: str):
-        return [address for address, offsets in self.search_from_text(pattern)]
+        return list(self.iter_address(pattern))
 
     def find_point(self, pattern: str):
-        return [[address + offset for offset in offsets] for address, offsets in self.search_from_text(pattern)]
+        return list(self.iter_point(pattern))
 
     def find_val(self, pattern: str):
-        return self.search_raw_pattern(sig_to_pattern(pattern)[0])
+        return list(self.iter_val(pattern))
+
+    def find_first(self, pattern: str):
+        # (address, offsets) of the first match, the scan stops there
+        matches = self.iter_from_text(pattern)
+        try:
+            return next(matches, None)
+        finally:
+            matches.close()
+
+    def iter_many(self, patterns: dict[str, str]):
+        # yield (name, address, offsets) of all signatures in scan order
+        multi = MultiPattern(patterns)
+        for idx, address, groups in self.iter_raw_many(multi):
+            yield multi.resolve(idx, address, groups)
+
+    def search_many(self, patterns: dict[str, str], limit: int = None):
+        if self.engine != 'regex':
+            return {name: list(itertools.islice(self.iter_from_text(pattern), limit)) for name, pattern in patterns.items()}
+        multi = MultiPattern(patterns)
+        return {
+            name: [multi.resolve(idx, address, groups)[1:] for address, groups in matches]
+            for idx, (name, matches) in enumerate(zip(multi.names, self.search_raw_many(multi, limit)))
+        }
+
+    def find_address_many(self, patterns: dict[str, str], limit: int = None):
+        return {name: [address for address, offsets in matches] for name, matches in self.search_many(patterns, limit).items()}
+
+    def find_point_many(self, patterns: dict[str, str], limit: int = None):
+        return {
+            name: [[address + offset for offset in offsets] for address, offsets in matches]
+            for name, matches in self.search_many(patterns, limit).items()
+        }
+
+
+class StaticPatternSearcher(PatternSearcher):
+    # sections are scanned in place over the mapped file of the pe with pos / endpos, nothing is copied
+    # sections: name globs (default .text), characteristics: required SCN_* flags, eg. SCN_MEM_EXECUTE
+    def __init__(
+            self,
+            pe,
+            base_address=0,
+            engine='regex',
+            file_path: str = None,
+            workers=0,
+            chunk_size=0x400000,
+            sections: str | typing.Iterable[str] = None,
+            characteristics: int = None,
+            cache=None,
+    ):
+        if engine not in self.engines: raise ValueError(f'Invalid engine {engine}')
+        self.engine = engine
+        self.pe = pe
+        self.scope = section_scope(sections, characteristics)
+        if sections is None and characteristics is None: sections = '.text'
+        self.sections = section_ranges(pe, sections, characteristics or 0)
+        self.section_virtual_addresses = [sect.virtual_address for sect in self.sections]
+        self.section_file_ranges = [(sect.offset, sect.size) for sect in self.sections]
+        self.base_address = base_address
+        self.file_path = file_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.cache = cache  # ModuleCache to keep the indexes of sig_maker
+        self._sig_maker = None
+
+    @property
+    def data(self):
+        return self.pe.__data__
+
+    @property
+    def sig_maker(self):
+        if self._sig_maker is None:
+            from .siggen import SigMaker
+            self._sig_maker = SigMaker(self.pe, self.sections, self.scope, self.cache)
+        return self._sig_maker
+
+    def make_sig(self, address: int, max_length: int = 0x40) -> str | None:
+        # shortest signature only matches at address in the scanned sections
+        return self.sig_maker.make(address - self.base_address, max_length)
+
+    def make_ref_sig(self, address: int, max_length: int = 0x40) -> str | None:
+        # shortest signature of a code referencing address, find_point of it gives address
+        return self.sig_maker.make_ref(address - self.base_address, max_length)
+
+    def iter_sections(self, pattern: re.Pattern | MaskedPattern | MultiPattern, anchor, overlap: int):
+        # yield (address - file offset, matches) of each section,
+        # matches are every (start, end, groups) or (idx, start, end, groups) in file offset
+        if not (self.workers > 1 and self.file_path):
+            for (offset, size), va in zip(self.section_file_ranges, self.section_virtual_addresses):
+                if isinstance(pattern, MultiPattern):
+                    matches = pattern.iter_matches(self.data, offset, offset + size)
+                else:
+                    matches = (
+                        (match.start(), match.end(), match.groups())
+                        for match in iter_pattern(pattern, self.data, offset, offset + size, anchor)
+                    )
+                yield va + self.base_address - offset, matches
+            return
+        sections = []
+        for offset, size in self.section_file_ranges:
+            end = offset + size
+            sections.append([self.executor.submit(
+                scan_file_chunk, self.file_path, pattern, anchor,
+                pos, min(pos + self.chunk_size, end), min(pos + self.chunk_size + overlap, end)
+            ) for pos in range(offset, end, self.chunk_size)])
+        try:
+            for (offset, size), va, futures in zip(self.section_file_ranges, self.section_virtual_addresses, sections):
+                yield va + self.base_address - offset, (match for future in futures for match in future.result())
+        finally:
+            for futures in sections:
+                for future in futures:
+                    future.cancel()
+
+    def iter_raw_pattern(self, pattern: bytes | re.Pattern | MaskedPattern, anchor: tuple[int, bytes] = None, max_length: int = None):
+        pattern = compile_pattern(pattern)
+        for va, matches in self.iter_sections(pattern, anchor, (max_length or self.default_max_length) - 1):
+            for start, groups in non_overlapping(matches):
+                yield start + va, group_values(groups)
+
+    def iter_raw_many(self, multi: MultiPattern):
+        for va, matches in self.iter_sections(multi, None, max(multi.lengths, default=1) - 1):
+            for idx, start, groups in multi.select(matches):
+                yield idx, start + va, group_values(groups)
+
+
+class MemoryPatternSearcher(PatternSearcher):
+    def __init__(
+            self,
+            handle,
+            start: int = 0,
+            end: int = None,
+            chunk_size: int = 0x100000,
+            protect: int = None,
+            engine='regex',
+            workers=0,
+            pid: int = None,
+    ):
+        if engine not in self.engines: raise ValueError(f'Invalid engine {engine}')
+        self.engine = engine
+        self.handle = handle
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.protect = memory.EXECUTABLE_PROTECT if protect is None else protect
+        self.workers = workers
+        self.pid = pid
+        if workers > 1 and self.reopen_args() is None:
+            raise ValueError(f'{type(handle).__name__} can not be reopened by the workers, use workers=0')
+
+    def reopen_args(self):
+        # how the workers open the memory, by pid when given
+        if self.pid: return (source.WinApiSource.open if kernel32 else source.ProcessVmSource), (self.pid,)
+        return source.as_source(self.handle).reopen_args()
+
+    def iter_chunk_ranges(self, overlap: int):
+        # yield (address, limit, end), matches start at or after limit belong to the next chunk
+        regions = memory.iter_memory_region(self.handle, self.start, self.end, self.protect)
+        return memory.iter_chunk_ranges(regions, self.start, self.end, self.chunk_size, 1, overlap)
+
+    def iter_chunks(self, overlap: int):
+        # yield (address, data, limit) with limit relative to the chunk
+        for address, data, limit in memory.iter_region_chunks(
+                self.handle, self.start, self.end, self.protect, self.chunk_size, 1, overlap
+        ):
+            yield address, data, limit - address
+
+    def scan_parallel(self, pattern, anchor, overlap: int):
+        # every match in all chunks, the chunks are read and scanned in the process pool
+        reopen_args = self.reopen_args()
+        return iter_futures([
+            self.executor.submit(scan_process_chunk, reopen_args, pattern, anchor, address, limit, end)
+            for address, limit, end in self.iter_chunk_ranges(overlap)
+        ])
 
+    def iter_raw_pattern(self, pattern: bytes | re.Pattern | MaskedPattern, anchor: tuple[int, bytes] = None, max_length: int = None):
+        pattern = compile_pattern(pattern)
+        overlap = (max_length or self.default_max_length) - 1
+        if self.workers > 1:
+            matches = self.scan_parallel(pattern, anchor, overlap)
+            try:
+                for start, groups in non_overlapping(matches):
+                    yield start, group_values(groups)
+            finally:
+                matches.close()
+            return
+        last_end = 0
+        for address, data, limit in self.iter_chunks(overlap):
+            for match in iter_pattern(pattern, data, max(last_end - address, 0), anchor=anchor):
+                if match.start() >= limit: break
+                last_end = address + match.end()
+                yield address + match.start(), group_values(match.groups())
 
-class MemoryPatternSearcher:
-    pass
+    def iter_raw_many(self, multi: MultiPattern):
+        overlap = max(multi.lengths, default=1) - 1
+        if self.workers > 1:
+            matches = self.scan_parallel(multi, None, overlap)
+            try:
+                for idx, start, groups in multi.select(matches):
+                    yield idx, start, group_values(groups)
+            finally:
+                matches.close()
+            return
+        last_end = [0] * len(multi.names)
+        for address, data, limit in self.iter_chunks(overlap):
+            matches = multi.iter_matches(data, starts=[max(e - address, 0) for e in last_end])
+            try:
+                for idx, start, end, groups in matches:
+                    if start >= limit: break
+                    last_end[idx] = address + end
+                    yield idx, start + address, group_values(groups)
+            finally:
+                matches.close()
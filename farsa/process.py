@@ -13,12 +13,26 @@ except ImportError:
 else:
     use_chardet = True
 from .pefile import PE
-from .winapi import kernel32, structure
-from .utils import process, memory, network, injection
-from .struct.remote import Remote, to_remote_type, RemoteMemStruct
-from .pattern import StaticPatternSearcher
+from .winapi import structure
+from .utils import memory
+from .utils.source import MemorySource, WinApiSource, ProcessVmSource, PageCacheSource
+from .struct_.remote import Remote, to_remote_type, RemoteMemStruct
+from .pattern import StaticPatternSearcher, section_scope, section_ranges, SCN_MEM_EXECUTE
+from .xref import XrefIndex
+from .strings import StringIndex
+from .functions import FunctionIndex
+from .rtti import RttiIndex, RttiClass
+from .scanner.vtable import VtableScanner
+from .scanner.instance import StructScanner
+from .cache import ModuleCache
 from .exception import WinAPIError
 
+try:
+    from .winapi import kernel32
+    from .utils import process, network, injection
+except Exception:  # off windows a Process only reads / writes through its memory source
+    kernel32 = process = network = injection = None
+
 _t = TypeVar('_t')
 
 _is_wow_64 = ctypes.sizeof(ctypes.c_void_p) == 4
@@ -29,14 +43,141 @@ def wow64(is_wow_64: bool) -> str:
 
 
 class ModuleInfo:
-    def __init__(self, handle, module_name: bytes):
+    def __init__(self, handle, module_name: bytes, cache_dir: str = None, source: MemorySource = None):
+        # memory of the module is read through source, the one of the owning Process
         self.handle = handle
+        self.source = WinApiSource(handle) if source is None else source
         self.module_name = module_name
+        self.cache_dir = cache_dir
         self._module_info = process.get_module_by_name(handle, module_name)
+        self._pattern_scanners: dict[str, StaticPatternSearcher] = {}
 
-    @cached_property
+    def get_pattern_scanner(self, sections: str | list[str] = None, characteristics: int = None) -> StaticPatternSearcher:
+        # one scanner, and so one section index, per section selection
+        scope = section_scope(sections, characteristics)
+        if scope not in self._pattern_scanners:
+            self._pattern_scanners[scope] = StaticPatternSearcher(
+                self.pe, self.base_address, file_path=self.file_path,
+                sections=sections, characteristics=characteristics, cache=self.cache,
+            )
+        return self._pattern_scanners[scope]
+
+    @property
     def pattern_scanner(self):
-        return StaticPatternSearcher(self.pe,self.base_address)
+        return self.get_pattern_scanner()
+
+    @cached_property
+    def cache(self):
+        return ModuleCache(self.pe, self.module_name.decode(structure.DEFAULT_CODING, 'ignore'), self.cache_dir)
+
+    def search_from_text(self, pattern: str, sections: str | list[str] = None, characteristics: int = None):
+        base_address = self.base_address
+        scanner = self.get_pattern_scanner(sections, characteristics)
+        if (res := self.cache.get_sig(pattern, scanner.scope)) is None:
+            res = [(address - base_address, offsets) for address, offsets in scanner.search_from_text(pattern)]
+            self.cache.set_sig(pattern, res, scanner.scope)
+            self.cache.save()
+        return [(rva + base_address, offsets) for rva, offsets in res]
+
+    def search_many(self, patterns: dict[str, str], limit: int = None, sections: str | list[str] = None, characteristics: int = None):
+        base_address = self.base_address
+        scanner = self.get_pattern_scanner(sections, characteristics)
+        res = {}
+        missing = {}
+        for name, pattern in patterns.items():
+            if (_res := self.cache.get_sig(pattern, scanner.scope)) is None:
+                missing[name] = pattern
+            else:
+                res[name] = _res[:limit]
+        if missing:
+            for name, matches in scanner.search_many(missing, limit).items():
+                res[name] = [(address - base_address, offsets) for address, offsets in matches]
+                # a limited scan may be incomplete, only full results are cached
+                if limit is None: self.cache.set_sig(missing[name], res[name], scanner.scope)
+            self.cache.save()
+        return {name: [(rva + base_address, offsets) for rva, offsets in res[name]] for name in patterns}
+
+    def find_first(self, pattern: str, sections: str | list[str] = None, characteristics: int = None):
+        scanner = self.get_pattern_scanner(sections, characteristics)
+        if (res := self.cache.get_sig(pattern, scanner.scope)) is not None:
+            return (res[0][0] + self.base_address, res[0][1]) if res else None
+        return scanner.find_first(pattern)
+
+    def find_address(self, pattern: str, sections: str | list[str] = None, characteristics: int = None):
+        return [address for address, offsets in self.search_from_text(pattern, sections, characteristics)]
+
+    def find_point(self, pattern: str, sections: str | list[str] = None, characteristics: int = None):
+        return [[address + offset for offset in offsets] for address, offsets in self.search_from_text(pattern, sections, characteristics)]
+
+    @cached_property
+    def xrefs(self) -> XrefIndex:
+        # rva index of the rel32 branches and rip relative operands in the executable sections
+        if (arrays := self.cache.load_arrays('xrefs.npz')) is not None:
+            return XrefIndex(**arrays)
+        res = XrefIndex.from_pe(self.pe, section_ranges(self.pe, characteristics=SCN_MEM_EXECUTE))
+        self.cache.save_arrays('xrefs.npz', res.arrays())
+        return res
+
+    def find_xrefs(self, address: int, kind: int = None) -> list[int]:
+        # address of the instructions referencing address, kind is one of xref.CALL, xref.JMP, xref.RIP
+        base_address = self.base_address
+        return [rva + base_address for rva in self.xrefs.refs_to(address - base_address, kind)]
+
+    def find_callers(self, address: int) -> list[int]:
+        base_address = self.base_address
+        return [rva + base_address for rva in self.xrefs.callers(address - base_address)]
+
+    @cached_property
+    def strings(self) -> StringIndex:
+        # rva index of the ascii / utf-16 strings in the data sections and their references
+        if (data := self.cache.load_json('strings.json')) is not None:
+            return StringIndex.from_json(data)
+        res = StringIndex.from_pe(self.pe, xrefs=self.xrefs)
+        self.cache.save_json('strings.json', res.to_json())
+        return res
+
+    def find_string_refs(self, text: str, kind: int = None) -> list[int]:
+        # address of the code / pointers referencing the string, kind is xref.RIP or xref.PTR
+        base_address = self.base_address
+        return [rva + base_address for rva in self.strings.find_refs(text, kind)]
+
+    @cached_property
+    def functions(self) -> FunctionIndex:
+        # rva index of the function ranges in the exception directory
+        return FunctionIndex.from_pe(self.pe)
+
+    def find_function(self, address: int) -> tuple[int, int] | None:
+        # (start, end) address of the runtime function entry contains address
+        if (res := self.functions.find(address - self.base_address)) is None: return None
+        return res[0] + self.base_address, res[1] + self.base_address
+
+    def find_function_start(self, address: int) -> int | None:
+        if (res := self.functions.function_start(address - self.base_address)) is None: return None
+        return res + self.base_address
+
+    def find_function_starts(self, pattern: str, sections: str | list[str] = None, characteristics: int = None) -> list[int | None]:
+        # start of the function contains each match of the signature
+        return [self.find_function_start(address) for address in self.find_address(pattern, sections, characteristics)]
+
+    @cached_property
+    def rtti(self) -> RttiIndex:
+        # vtable rva -> class index of the msvc rtti
+        if (data := self.cache.load_json('rtti.json')) is not None:
+            return RttiIndex.from_json(data)
+        res = RttiIndex.from_pe(self.pe)
+        self.cache.save_json('rtti.json', res.to_json())
+        return res
+
+    def class_of_vtable(self, vtable: int) -> RttiClass | None:
+        return self.rtti.get(vtable - self.base_address)
+
+    def class_of(self, address: int) -> RttiClass | None:
+        # class of the object at address by its vtable pointer
+        return self.class_of_vtable(memory.read_memory(self.source, ctypes.c_size_t, address).value)
+
+    def find_vtables(self, class_name: str) -> list[int]:
+        base_address = self.base_address
+        return [rva + base_address for rva in self.rtti.find_vtables(class_name)]
 
     @cached_property
     def pe(self):
@@ -51,6 +192,14 @@ class ModuleInfo:
         def file_path(self) -> str:
             return self._module_info.filename.decode(locale.getpreferredencoding())
 
+    def close(self):
+        for scanner in self._pattern_scanners.values():
+            scanner.close()
+        self._pattern_scanners.clear()
+        if 'pe' in self.__dict__:
+            self.pe.close()
+            del self.pe
+
     @property
     def base_address(self) -> int:
         return self._module_info.lpBaseOfDll
@@ -61,19 +210,39 @@ class ModuleInfo:
 
 
 class Process:
-    def __init__(self, pid: int = None):
+    def __init__(self, pid: int = None, cache_dir: str = None, source: MemorySource = None):
+        # source defaults to the winapi over the process handle, process_vm_readv off windows
         if pid is None: pid = os.getpid()
         self.pid = pid
+        self.cache_dir = cache_dir
         self.handle = None
-        self.handle = kernel32.OpenProcess(structure.PROCESS.PROCESS_ALL_ACCESS.value, False, pid)
-        if not self.handle: raise WinAPIError(kernel32.GetLastError(), 'OpenProcess')
-        is_wow_64 = process.process_is_wow64(self.handle)
-        if is_wow_64 != _is_wow_64:
-            raise Exception(f'Process is in {wow64(is_wow_64)} mode, but this module is in {wow64(_is_wow_64)} mode')
+        if kernel32 is not None:
+            self.handle = kernel32.OpenProcess(structure.PROCESS.PROCESS_ALL_ACCESS.value, False, pid)
+            if not self.handle: raise WinAPIError(kernel32.GetLastError(), 'OpenProcess')
+            is_wow_64 = process.process_is_wow64(self.handle)
+            if is_wow_64 != _is_wow_64:
+                raise Exception(f'Process is in {wow64(is_wow_64)} mode, but this module is in {wow64(_is_wow_64)} mode')
+            if source is None: source = WinApiSource(self.handle)
+        elif source is None:
+            source = ProcessVmSource(pid)
+        self.source = source
         self._module_info_cache: dict[bytes, ModuleInfo] = {}
         self._base_module: ModuleInfo | None = None
         self._injected_py_base = None
 
+    def enable_page_cache(self, max_bytes: int = 0x1000000, ttl: float = None) -> PageCacheSource:
+        # reads go through cached whole pages until the next tick or for ttl seconds, see source.PageCacheSource
+        if not isinstance(self.source, PageCacheSource):
+            self.source = PageCacheSource(self.source, max_bytes, ttl)
+            for module in self._module_info_cache.values():
+                module.source = self.source
+        return self.source
+
+    def tick(self) -> int:
+        # drop the cached pages, returns the new generation
+        if isinstance(self.source, PageCacheSource): return self.source.tick()
+        return 0
+
     @classmethod
     def from_name(cls, process_name: str) -> 'Process':
         return cls(process.get_pid_by_name(process_name))
@@ -84,7 +253,7 @@ class Process:
 
     def get_module_info(self, module_name: bytes) -> ModuleInfo:
         if module_name not in self._module_info_cache:
-            self._module_info_cache[module_name] = ModuleInfo(self.handle, module_name)
+            self._module_info_cache[module_name] = ModuleInfo(self.handle, module_name, self.cache_dir, self.source)
         return self._module_info_cache[module_name]
 
     @property
@@ -103,10 +272,38 @@ class Process:
         _d_type = to_remote_type(d_type)
         if isclass(_d_type) and issubclass(_d_type, RemoteMemStruct):
             return _d_type(remote=Remote(self, address))
-        return memory.read_memory(self.handle, d_type, address)
+        return memory.read_memory(self.source, d_type, address)
+
+    def read_into(self, address: int, buf: _t) -> _t:
+        # fill a caller owned writable buffer without allocating, see memory.read_into
+        return memory.read_into(self.source, address, buf)
+
+    def read_many(self, requests: list[tuple[int, int]], gap: int = 0x200) -> list[memoryview | None]:
+        # bytes of many (address, size) at once, see memory.read_many
+        return memory.read_many(self.source, requests, gap)
+
+    def get_class(self, address: int) -> RttiClass | None:
+        # class of the object at address, the vtable is looked up in the modules already opened by get_module_info
+        vtable = memory.read_memory(self.source, ctypes.c_size_t, address).value
+        for module in self._module_info_cache.values():
+            if module.base_address <= vtable < module.base_address + module.module_size:
+                return module.class_of_vtable(vtable)
+        return None
+
+    def find_instances(self, vtables: int | list[int], d_type: Type[_t] = None, protect: int = None) -> list[_t] | list[int]:
+        # objects in the readable memory whose vtable pointer is one of vtables, read as d_type if given
+        addresses = VtableScanner(self.source, protect=protect).find(vtables).tolist()
+        if d_type is None: return addresses
+        return [self.read(d_type, address) for address in addresses]
+
+    def find_structs(self, d_type: Type[_t], predicates: dict, alignment: int = 8, protect: int = None, read=True) -> list[_t] | list[int]:
+        # instances of the struct in the readable memory whose fields pass the predicates, see scanner.instance
+        addresses = StructScanner(self.source, d_type, predicates, alignment, protect=protect).find().tolist()
+        if not read: return addresses
+        return [self.read(d_type, address) for address in addresses]
 
     def write(self, d_type: Type[_t], address: int, value: _t):
-        return memory.write_memory(self.handle, address, value)
+        return memory.write_memory(self.source, address, value)
 
     def inject_python(self):
         if self._injected_py_base is None:
@@ -120,7 +317,7 @@ class Process:
     def exec_shell(self, shell_code: bytes, auto_inject=False):
         py_base_address = self._injected_py_base or injection.get_python_base_address(self.handle, auto_inject)
         shell_code_address = self.alloc(len(shell_code))
-        memory.write_string(self.handle, shell_code_address, shell_code)
+        memory.write_string(self.source, shell_code_address, shell_code)
         process.start_thread(self.handle, py_base_address + injection.func_offsets['PyRun_SimpleString'], shell_code_address)
         # kernel32.VirtualFreeEx(self.handle, shell_code_address, 0, 0x8000)
 
@@ -0,0 +1,122 @@
+import ctypes
+import re
+import struct
+import typing
+
+from .strings import data_sections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    UnDecorateSymbolName = ctypes.windll.dbghelp.UnDecorateSymbolName
+    UnDecorateSymbolName.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_ulong]
+    UnDecorateSymbolName.restype = ctypes.c_ulong
+except Exception:
+    UnDecorateSymbolName = None
+
+PE32_PLUS = 0x20b
+UNDNAME_NAME_ONLY = 0x1000
+type_name_pattern = re.compile(rb'\.\?A[VU][\x21-\x7e]+?@@(?=\x00)')
+
+
+class RttiClass(typing.NamedTuple):
+    name: str
+    mangled: str
+    bases: list[str]
+    offset: int  # offset of this vtable in the complete object, not 0 for the secondary bases
+
+
+def demangle(mangled: str) -> str:
+    # .?AVClass@Namespace@@ to Namespace::Class, templates need dbghelp and are kept mangled without it
+    if UnDecorateSymbolName is not None:
+        buf = ctypes.create_string_buffer(0x400)
+        if UnDecorateSymbolName(f'??_7{mangled[4:]}6B@'.encode(), buf, len(buf), UNDNAME_NAME_ONLY):
+            return buf.value.decode('latin-1').removeprefix('const ').removesuffix("::`vftable'")
+    if '?' in mangled[4:]: return mangled
+    return '::'.join(reversed(mangled[4:-2].split('@')))
+
+
+class RttiIndex:
+    # vtable rva -> class of the MSVC run time type information, found from the complete object locators
+    # referenced by the data sections
+    def __init__(self, classes: dict[int, RttiClass]):
+        self.classes = classes
+
+    @classmethod
+    def from_pe(cls, pe):
+        if np is None: raise ImportError('numpy is required by the rtti parser')
+        is_64 = pe.OPTIONAL_HEADER.Magic == PE32_PLUS
+        ptr_size = 8 if is_64 else 4
+        image_base = pe.OPTIONAL_HEADER.ImageBase
+        # rtti pointers are rva on x64, va on x86
+        to_rva = (lambda v: v) if is_64 else (lambda v: v - image_base)
+        sections = data_sections(pe)
+        data = pe.__data__
+
+        type_names = {}  # type descriptor rva -> mangled name
+        for sect in sections:
+            for match in type_name_pattern.finditer(data, sect.offset, sect.offset + sect.size):
+                type_names[match.start() - sect.offset + sect.virtual_address - 2 * ptr_size] = match.group().decode('latin-1')
+        if not type_names: return cls({})
+        td_rvas = np.array(sorted(type_names), dtype=np.int64)
+
+        locators = []  # rva of the complete object locators
+        for sect in sections:
+            arr = np.frombuffer(data, '<u4', sect.size // 4, sect.offset).astype(np.int64)
+            if len(arr) < 6: continue
+            head = arr[:-5] if is_64 else arr[:-4]
+            hit = (head == (1 if is_64 else 0)) & np.isin(to_rva(arr[3:3 + len(head)]), td_rvas)
+            if is_64: hit &= arr[5:5 + len(head)] == np.arange(len(head)) * 4 + sect.virtual_address
+            locators.extend((np.flatnonzero(hit) * 4 + sect.virtual_address).tolist())
+        if not locators: return cls({})
+
+        def read_u32(rva, count=1):
+            return struct.unpack(f'<{count}I', pe.get_data(rva, 4 * count))
+
+        def read_class(col_rva):
+            signature, offset, cd_offset, td, chd = read_u32(col_rva, 5)
+            mangled = type_names[to_rva(td)]
+            chd_signature, attributes, count, base_array = read_u32(to_rva(chd), 4)
+            if chd_signature != 0 or count > 0x1000: return None
+            bases = []
+            for bcd in read_u32(to_rva(base_array), count)[1:]:
+                if (name := type_names.get(to_rva(read_u32(to_rva(bcd))[0]))) is not None:
+                    bases.append(demangle(name))
+            return RttiClass(demangle(mangled), mangled, bases, offset)
+
+        # the vtables are right after a pointer to their locator
+        col_vas = np.array(locators, dtype=np.int64) + image_base
+        classes = {}
+        parsed = {}
+        for sect in sections:
+            arr = np.frombuffer(data, f'<u{ptr_size}', sect.size // ptr_size, sect.offset).astype(np.int64)
+            for i in np.flatnonzero(np.isin(arr, col_vas)).tolist():
+                col_rva = int(arr[i]) - image_base
+                if col_rva not in parsed:
+                    try:
+                        parsed[col_rva] = read_class(col_rva)
+                    except (struct.error, KeyError):
+                        parsed[col_rva] = None
+                if parsed[col_rva] is not None:
+                    classes[sect.virtual_address + (i + 1) * ptr_size] = parsed[col_rva]
+        return cls(classes)
+
+    def to_json(self):
+        return [[rva, *cls] for rva, cls in self.classes.items()]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls({rva: RttiClass(name, mangled, bases, offset) for rva, name, mangled, bases, offset in data})
+
+    def __len__(self):
+        return len(self.classes)
+
+    def get(self, vtable_rva: int) -> RttiClass | None:
+        return self.classes.get(vtable_rva)
+
+    def find_vtables(self, name: str) -> list[int]:
+        # vtable rva of the class, several with multiple inheritance
+        return [rva for rva, cls in self.classes.items() if cls.name == name]
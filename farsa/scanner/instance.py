@@ -0,0 +1,179 @@
+import ctypes
+import typing
+
+from ..utils import memory
+from ..struct_.base import MemStruct, Field, ShiftField, Enum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Predicate:
+    # vectorized check on the values of a field, the cheaper ones run first on every address
+    cost = 3
+
+    def prepare(self, scanner: 'StructScanner', field_type):
+        pass
+
+    def __call__(self, values):
+        raise NotImplementedError()
+
+
+class Equal(Predicate):
+    cost = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def prepare(self, scanner, field_type):
+        if isinstance(field_type, type) and issubclass(field_type, Enum):
+            self.value = field_type._name_value_map.get(self.value, self.value)
+
+    def __call__(self, values):
+        return values == self.value
+
+
+class Between(Predicate):
+    # low <= value <= high, either side may be None
+    cost = 1
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def __call__(self, values):
+        if self.low is None: return values <= self.high
+        if self.high is None: return values >= self.low
+        return (values >= self.low) & (values <= self.high)
+
+
+class OneOf(Predicate):
+    # value in the set, enum names are accepted for enum fields
+    cost = 2
+
+    def __init__(self, values: typing.Iterable):
+        self.values = list(values)
+
+    def prepare(self, scanner, field_type):
+        if isinstance(field_type, type) and issubclass(field_type, Enum):
+            self.values = [field_type._name_value_map.get(v, v) for v in self.values]
+
+    def __call__(self, values):
+        return np.isin(values, self.values)
+
+
+class ValidPointer(Predicate):
+    # value points into a readable region of the scan, null is accepted when nullable
+    cost = 4
+
+    def __init__(self, nullable=False):
+        self.nullable = nullable
+        self.starts = self.ends = None
+
+    def prepare(self, scanner, field_type):
+        regions = sorted(scanner.regions)
+        self.starts = np.array([start for start, size in regions], dtype=np.uint64)
+        self.ends = self.starts + np.array([size for start, size in regions], dtype=np.uint64)
+
+    def __call__(self, values):
+        values = values.astype(np.uint64)
+        i = np.searchsorted(self.starts, values, 'right') - 1
+        res = (i >= 0) & (values < self.ends[np.maximum(i, 0)])
+        if self.nullable: res |= values == 0
+        return res
+
+
+class Custom(Predicate):
+    # any vectorized function of the values array returns a bool array
+    cost = 5
+
+    def __init__(self, func: typing.Callable):
+        self.func = func
+
+    def __call__(self, values):
+        return self.func(values)
+
+
+def to_predicate(value) -> Predicate:
+    if isinstance(value, Predicate): return value
+    if callable(value): return Custom(value)
+    return Equal(value)
+
+
+def field_dtype(field: Field):
+    # (numpy dtype, shifts, mask) of the raw value of a field
+    d_type = field.d_type
+    if isinstance(field, ShiftField):
+        return np.dtype(d_type._btype_), field.shifts, d_type._mask_
+    if issubclass(d_type, Enum): d_type = d_type._type_
+    if issubclass(d_type, (ctypes._Pointer, ctypes.c_void_p, ctypes.c_char_p, ctypes.c_wchar_p)):
+        return np.dtype(f'<u{ctypes.sizeof(d_type)}'), 0, None
+    return np.dtype(d_type), 0, None
+
+
+class StructScanner:
+    # every aligned address where the fields of a MemStruct pass all the predicates,
+    # the fields are read as strided numpy views of each chunk, the cheapest predicate runs on the whole chunk
+    # and the others only on the addresses left
+    def __init__(
+            self,
+            handle,
+            struct_type: typing.Type[MemStruct],
+            predicates: dict[str, typing.Any],
+            alignment: int = 8,
+            start: int = 0,
+            end: int = None,
+            protect: int = None,
+            chunk_size: int = 0x1000000,
+    ):
+        if np is None: raise ImportError('numpy is required by the struct scanner')
+        self.handle = handle
+        self.struct_type = struct_type
+        self.size = ctypes.sizeof(struct_type)
+        self.alignment = alignment
+        self.start = start
+        self.end = end
+        self.protect = memory.READABLE_PROTECT if protect is None else protect
+        self.chunk_size = chunk_size - chunk_size % alignment
+        self.regions = []
+        self.checks = []  # (predicate, field offset, dtype, shifts, mask, field type)
+        for name, predicate in predicates.items():
+            field = getattr(struct_type, name)
+            if not isinstance(field, Field): raise TypeError(f'{struct_type.__name__}.{name} is not a field')
+            dtype, shifts, mask = field_dtype(field)
+            self.checks.append((to_predicate(predicate), field.offset, dtype, shifts, mask, field.d_type))
+        self.checks.sort(key=lambda c: (c[0].cost, c[2].itemsize))
+
+    def iter_chunks(self):
+        # yield (address, data, count), data holds the count structs start at address
+        for address, data, limit in memory.iter_region_chunks(
+                self.handle, self.start, self.end, self.protect, self.chunk_size, self.alignment, self.size - 1, self.regions
+        ):
+            count = min((limit - address + self.alignment - 1) // self.alignment, (len(data) - self.size) // self.alignment + 1)
+            yield address, data, count
+
+    def values(self, data, count: int, candidates, offset: int, dtype, shifts: int, mask):
+        # values of a field of the structs at the candidates index, or of all count structs
+        res = np.ndarray((count,), dtype, data, offset, (self.alignment,))
+        if candidates is not None: res = res[candidates]
+        if mask is not None: res = res >> shifts & mask
+        return res
+
+    def find(self):
+        # sorted addresses of the matched structs
+        self.regions = list(memory.iter_memory_region(self.handle, self.start, self.end, self.protect))
+        for predicate, offset, dtype, shifts, mask, field_type in self.checks:
+            predicate.prepare(self, field_type)
+        res = []
+        for address, data, count in self.iter_chunks():
+            if count <= 0: continue
+            candidates = None
+            for predicate, offset, dtype, shifts, mask, field_type in self.checks:
+                hit = predicate(self.values(data, count, candidates, offset, dtype, shifts, mask))
+                candidates = np.flatnonzero(hit) if candidates is None else candidates[hit]
+                if not len(candidates): break
+            if candidates is None: candidates = np.arange(count)
+            if len(candidates): res.append(candidates.astype(np.uint64) * self.alignment + address)
+        return np.concatenate(res) if res else np.zeros(0, np.uint64)
@@ -0,0 +1,212 @@
+import ctypes
+import multiprocessing
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from ..utils import memory
+
+try:
+    from ..utils import process
+    from ..winapi import structure
+except Exception:
+    process = structure = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Chain(typing.NamedTuple):
+    # [[module base + offset] + offsets[0]] ... + offsets[-1] is the target
+    module: str
+    offset: int
+    offsets: tuple[int, ...]
+
+
+def expand_ranges(lo, hi):
+    # (owner, index) of every index in [lo[i], hi[i])
+    counts = hi - lo
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(lo)), counts)
+    return owner, np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+
+
+def find_chains_part(path: str, starts, suffixes, max_depth: int, max_offset: int, max_nodes: int, max_results: int):
+    # find_chains of a part of the nodes, run in the process pool
+    return PointerMap.load(path).search(starts, suffixes, max_depth, max_offset, max_nodes, max_results)
+
+
+class PointerMap:
+    # every readable location holding a pointer into a readable region, as (value, location) sorted by value,
+    # with the regions and the modules of the process at the time it is built
+    def __init__(self, values, locations, regions, module_names, module_bases, module_sizes, pointer_size: int = 8):
+        if np is None: raise ImportError('numpy is required by the pointer scanner')
+        self.values = values
+        self.locations = locations
+        self.regions = regions  # (n, 2) start / end sorted
+        self.module_names = [str(name) for name in module_names]
+        self.module_bases = module_bases
+        self.module_sizes = module_sizes
+        self.pointer_size = pointer_size
+        self.path = None
+        self._location_order = None
+
+    @classmethod
+    def from_chunks(cls, chunks: typing.Iterable[tuple[int, bytes]], regions: list[tuple[int, int]], modules: list[tuple[str, int, int]], pointer_size: int = 8):
+        # chunks are (address, data) of the readable memory, modules are (name, base, size)
+        if np is None: raise ImportError('numpy is required by the pointer scanner')
+        dtype = np.dtype(f'<u{pointer_size}')
+        regions = np.array(sorted(regions), dtype=np.int64).reshape(-1, 2)
+        values, locations = [], []
+        for address, data in chunks:
+            skip = -address % pointer_size
+            arr = np.frombuffer(data, dtype, (len(data) - skip) // pointer_size, skip).astype(np.int64)
+            i = np.searchsorted(regions[:, 0], arr, 'right') - 1
+            hit = np.flatnonzero((i >= 0) & (arr < regions[i, 1]))
+            values.append(arr[hit])
+            locations.append(hit * pointer_size + address + skip)
+        values = np.concatenate(values) if values else np.zeros(0, np.int64)
+        locations = np.concatenate(locations) if locations else np.zeros(0, np.int64)
+        order = np.argsort(values, kind='stable')
+        modules = sorted(modules, key=lambda m: m[1])
+        return cls(
+            values[order], locations[order], regions,
+            [m[0] for m in modules], np.array([m[1] for m in modules], np.int64), np.array([m[2] for m in modules], np.int64),
+            pointer_size,
+        )
+
+    @classmethod
+    def from_process(cls, handle, chunk_size: int = 0x1000000, protect: int = None):
+        protect = memory.READABLE_PROTECT if protect is None else protect
+        regions = list(memory.iter_memory_region(handle, 0, None, protect))
+        modules = [
+            (module.name.decode(structure.DEFAULT_CODING, 'ignore'), module.lpBaseOfDll, module.SizeOfImage)
+            for module in process.enum_process_module(handle)
+        ]
+        chunks = ((address, data) for address, data, limit in memory.iter_region_chunks(handle, chunk_size=chunk_size, regions=regions))
+        return cls.from_chunks(chunks, [(base, base + size) for base, size in regions], modules, ctypes.sizeof(ctypes.c_void_p))
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f, values=self.values, locations=self.locations, regions=self.regions,
+                module_names=np.array(self.module_names, dtype=str), module_bases=self.module_bases,
+                module_sizes=self.module_sizes, pointer_size=np.array(self.pointer_size),
+            )
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as f:
+            res = cls(
+                f['values'], f['locations'], f['regions'], f['module_names'].tolist(),
+                f['module_bases'], f['module_sizes'], int(f['pointer_size']),
+            )
+        res.path = path
+        return res
+
+    def __len__(self):
+        return len(self.values)
+
+    def module_index(self, addresses):
+        # index of the module contains each address, -1 if none
+        if not len(self.module_bases): return np.full(len(addresses), -1)
+        i = np.searchsorted(self.module_bases, addresses, 'right') - 1
+        return np.where((i >= 0) & (addresses < self.module_bases[i] + self.module_sizes[i]), i, -1)
+
+    def value_at(self, address: int) -> int | None:
+        # pointer stored at address when the map was built
+        if self._location_order is None:
+            self._location_order = np.argsort(self.locations, kind='stable')
+        i = np.searchsorted(self.locations, address, sorter=self._location_order)
+        if i < len(self.locations) and self.locations[j := self._location_order[i]] == address:
+            return int(self.values[j])
+
+    def resolve(self, chain: Chain) -> int | None:
+        # target address of the chain in this map, None if broken
+        try:
+            address = int(self.module_bases[self.module_names.index(chain.module)]) + chain.offset
+        except ValueError:
+            return None
+        for offset in chain.offsets:
+            if (value := self.value_at(address)) is None: return None
+            address = value + offset
+        return address
+
+    def search(self, starts, suffixes: list[tuple[int, ...]], max_depth: int, max_offset: int, max_nodes: int, max_results: int):
+        # breadth first from the starts to the static locations, each start reached by the offsets of its suffix
+        starts = np.asarray(starts, dtype=np.int64)
+        res = []
+        levels = []  # (offsets, parent index) of each level
+        frontier = starts
+        visited = np.unique(starts)
+        for depth in range(max_depth):
+            if not len(frontier) or len(res) >= max_results: break
+            lo = np.searchsorted(self.values, frontier - max_offset, 'left')
+            hi = np.searchsorted(self.values, frontier, 'right')
+            parent, index = expand_ranges(lo, hi)
+            nodes = self.locations[index]
+            offsets = frontier[parent] - self.values[index]
+            levels.append((offsets, parent))
+            module = self.module_index(nodes)
+            for i in np.flatnonzero(module >= 0)[:max_results - len(res)].tolist():
+                path = []
+                j = i
+                for level in range(depth, -1, -1):
+                    path.append(int(levels[level][0][j]))
+                    j = levels[level][1][j]
+                m = module[i]
+                res.append(Chain(self.module_names[m], int(nodes[i] - self.module_bases[m]), tuple(path) + suffixes[j]))
+            # continue from the non static locations not reached before
+            keep = np.flatnonzero((module < 0) & ~np.isin(nodes, visited))
+            _, first = np.unique(nodes[keep], return_index=True)
+            keep = np.sort(keep[first])[:max_nodes]
+            levels[-1] = (offsets[keep], parent[keep])
+            frontier = nodes[keep]
+            visited = np.union1d(visited, frontier)
+        return res
+
+    def find_chains(
+            self,
+            target: int,
+            max_depth: int = 5,
+            max_offset: int = 0x1000,
+            max_nodes: int = 0x100000,
+            max_results: int = 0x10000,
+            workers: int = 0,
+    ) -> list[Chain]:
+        # static pointer chains to target, the offsets are in [0, max_offset]; with workers the map must be saved / loaded
+        # from a file, the nodes of the first level are split between the processes
+        if not (workers > 1 and self.path) or max_depth < 2:
+            return self.search([target], [()], max_depth, max_offset, max_nodes, max_results)
+        lo = np.searchsorted(self.values, [target - max_offset], 'left')
+        hi = np.searchsorted(self.values, [target], 'right')
+        _, index = expand_ranges(lo, hi)
+        nodes = self.locations[index]
+        offsets = target - self.values[index]
+        module = self.module_index(nodes)
+        res = [
+            Chain(self.module_names[m], int(nodes[i] - self.module_bases[m]), (int(offsets[i]),))
+            for i, m in enumerate(module.tolist()) if m >= 0
+        ]
+        rest = np.flatnonzero(module < 0)
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [
+                executor.submit(
+                    find_chains_part, self.path, nodes[part], [(int(offsets[i]),) for i in part.tolist()],
+                    max_depth - 1, max_offset, max_nodes, max_results,
+                ) for part in np.array_split(rest, workers) if len(part)
+            ]
+            seen = set(res)
+            for future in futures:
+                for chain in future.result():
+                    if chain not in seen:
+                        seen.add(chain)
+                        res.append(chain)
+        return res[:max_results]
+
+
+def compare_chains(chains: typing.Iterable[Chain], other: PointerMap, target: int) -> list[Chain]:
+    # the chains still leading to target in a map built in another session
+    return [chain for chain in chains if other.resolve(chain) == target]
@@ -0,0 +1,163 @@
+import ctypes
+import typing
+
+from ..exception import WinAPIError
+from ..utils import memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# first scan types
+EXACT = 'exact'
+RANGE = 'range'
+UNKNOWN = 'unknown'
+# next scan types, EXACT and RANGE work as well
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+INCREASED = 'increased'
+DECREASED = 'decreased'
+
+
+def as_values(buf, dtype, alignment: int, count: int = None):
+    # view of the values at every alignment bytes of buf, values may be unaligned
+    n = (len(buf) - dtype.itemsize) // alignment + 1 if len(buf) >= dtype.itemsize else 0
+    if count is not None: n = min(n, count)
+    return np.ndarray((n,), dtype, buf, strides=(alignment,))
+
+
+def compare(scan_type: str, new, old=None, value=None, high=None):
+    # mask of the values pass the scan
+    if scan_type == EXACT: return new == value
+    if scan_type == RANGE: return (new >= value) & (new <= high)
+    if scan_type == UNKNOWN: return np.ones(len(new), dtype=bool)
+    if old is None: raise ValueError(f'{scan_type} scan needs a previous scan')
+    if scan_type == CHANGED: return new != old
+    if scan_type == UNCHANGED: return new == old
+    if scan_type == INCREASED: return new > old
+    if scan_type == DECREASED: return new < old
+    raise ValueError(f'Invalid scan type {scan_type}')
+
+
+class ValueScanner:
+    # candidates are kept as sorted address / value numpy arrays, or as a copy of the memory after an unknown first scan
+    def __init__(
+            self,
+            handle,
+            d_type: typing.Type[ctypes._SimpleCData],
+            start: int = 0,
+            end: int = None,
+            protect: int = None,
+            alignment: int = None,
+            chunk_size: int = 0x1000000,
+    ):
+        if np is None: raise ImportError('numpy is required by the value scanner')
+        self.handle = handle
+        self.dtype = np.dtype(d_type)
+        self.start = start
+        self.end = end
+        self.protect = memory.READABLE_PROTECT if protect is None else protect
+        self.alignment = alignment or self.dtype.itemsize
+        self.chunk_size = chunk_size - chunk_size % self.alignment
+        self.addresses = None
+        self.values = None
+        self.snapshot = None  # [(address, bytes, count)] after an unknown first scan
+        self.regions = []  # (base, size) of the first scan, a group of candidates is read within one
+
+    def iter_chunks(self):
+        # yield (address, data, count), data has the bytes of the count values start at address
+        for address, data, limit in memory.iter_region_chunks(
+                self.handle, self.start, self.end, self.protect, self.chunk_size, self.alignment, self.dtype.itemsize - 1, self.regions
+        ):
+            yield address, data, (limit - address + self.alignment - 1) // self.alignment
+
+    def __len__(self):
+        if self.snapshot is not None:
+            return sum(as_values(data, self.dtype, self.alignment, count).size for _, data, count in self.snapshot)
+        return 0 if self.addresses is None else len(self.addresses)
+
+    def reset(self):
+        self.addresses = self.values = self.snapshot = None
+        self.regions = []
+
+    def _set(self, addresses: list, values: list):
+        self.snapshot = None
+        self.addresses = np.concatenate(addresses) if addresses else np.zeros(0, np.uint64)
+        self.values = np.concatenate(values) if values else np.zeros(0, self.dtype)
+
+    def first_scan(self, scan_type: str = EXACT, value=None, high=None) -> int:
+        # scan every readable value, returns the count of the candidates
+        self.reset()
+        self.regions = sorted(memory.iter_memory_region(self.handle, self.start, self.end, self.protect))
+        if scan_type == UNKNOWN:
+            self.snapshot = list(self.iter_chunks())
+            return len(self)
+        addresses, values = [], []
+        for address, data, count in self.iter_chunks():
+            new = as_values(data, self.dtype, self.alignment, count)
+            hit = np.flatnonzero(compare(scan_type, new, None, value, high))
+            if not len(hit): continue
+            addresses.append(hit.astype(np.uint64) * self.alignment + address)
+            values.append(new[hit])
+        self._set(addresses, values)
+        return len(self)
+
+    def iter_groups(self):
+        # yield (start, end) index of the candidates in the same chunk sized window of one region, read at once
+        if not len(self.addresses): return
+        keys = self.addresses // self.chunk_size
+        region = np.searchsorted(np.array([base for base, size in self.regions], dtype=np.uint64), self.addresses, 'right')
+        bounds = np.flatnonzero((keys[1:] != keys[:-1]) | (region[1:] != region[:-1])) + 1
+        yield from zip([0, *bounds.tolist()], [*bounds.tolist(), len(keys)])
+
+    def read_values(self):
+        # (mask, values) current values of the candidates, mask is false where memory can not be read
+        itemsize = self.dtype.itemsize
+        ok = np.zeros(len(self.addresses), dtype=bool)
+        res = np.zeros(len(self.addresses), dtype=self.dtype)
+        for i, j in self.iter_groups():
+            addresses = self.addresses[i:j]
+            base = int(addresses[0])
+            try:
+                data = np.frombuffer(memory.read_bytes(self.handle, base, int(addresses[-1]) - base + itemsize), dtype=np.uint8)
+            except WinAPIError:
+                # a page of the window is gone, the candidates are read one by one
+                for k, view in enumerate(memory.read_many(self.handle, [(address, itemsize) for address in addresses.tolist()])):
+                    if view is not None:
+                        res[i + k] = np.frombuffer(view, self.dtype)[0]
+                        ok[i + k] = True
+                continue
+            offsets = (addresses - base).astype(np.intp)
+            res[i:j] = data[offsets[:, None] + np.arange(itemsize)].view(self.dtype).ravel()
+            ok[i:j] = True
+        return ok, res
+
+    def next_scan(self, scan_type: str = CHANGED, value=None, high=None) -> int:
+        # narrow the candidates comparing their current values with the last ones, returns the count of the candidates
+        if self.snapshot is not None:
+            addresses, values = [], []
+            for address, old_data, count in self.snapshot:
+                try:
+                    data = memory.read_bytes(self.handle, address, len(old_data))
+                except WinAPIError:
+                    continue
+                new = as_values(data, self.dtype, self.alignment, count)
+                hit = np.flatnonzero(compare(scan_type, new, as_values(old_data, self.dtype, self.alignment, count), value, high))
+                if not len(hit): continue
+                addresses.append(hit.astype(np.uint64) * self.alignment + address)
+                values.append(new[hit])
+            self._set(addresses, values)
+            return len(self)
+        if self.addresses is None: raise ValueError('next scan before first scan')
+        ok, new = self.read_values()
+        hit = ok & compare(scan_type, new, self.values, value, high)
+        self.addresses = self.addresses[hit]
+        self.values = new[hit]
+        return len(self)
+
+    def results(self, limit: int = None) -> list[tuple[int, typing.Any]]:
+        # (address, last value) of the candidates
+        if self.snapshot is not None: raise ValueError('narrow an unknown scan before reading the results')
+        if self.addresses is None: return []
+        return list(zip(self.addresses[:limit].tolist(), self.values[:limit].tolist()))
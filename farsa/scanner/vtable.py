@@ -0,0 +1,61 @@
+import ctypes
+import typing
+
+from ..utils import memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class VtableScanner:
+    # objects are found by their vtable pointer at offset 0, each region is read once per scan
+    # and compared as aligned pointer sized integers
+    def __init__(
+            self,
+            handle,
+            start: int = 0,
+            end: int = None,
+            protect: int = None,
+            chunk_size: int = 0x1000000,
+            pointer_size: int = ctypes.sizeof(ctypes.c_void_p),
+    ):
+        if np is None: raise ImportError('numpy is required by the vtable scanner')
+        self.handle = handle
+        self.start = start
+        self.end = end
+        self.protect = memory.READABLE_PROTECT if protect is None else protect
+        self.pointer_size = pointer_size
+        self.dtype = np.dtype(f'<u{pointer_size}')
+        self.chunk_size = chunk_size - chunk_size % pointer_size
+
+    def iter_chunks(self):
+        # yield (address, pointer array) of the readable memory, address is pointer aligned
+        for address, data, limit in memory.iter_region_chunks(
+                self.handle, self.start, self.end, self.protect, self.chunk_size, self.pointer_size
+        ):
+            yield address, np.frombuffer(data, self.dtype, len(data) // self.pointer_size)
+
+    def iter_matches(self, vtables: typing.Iterable[int]):
+        # yield (addresses, vtables) of the matched objects in each chunk
+        vtables = np.array(sorted(set(vtables)), dtype=self.dtype)
+        for address, arr in self.iter_chunks():
+            hit = np.flatnonzero(np.isin(arr, vtables))
+            if len(hit):
+                yield hit.astype(np.uint64) * self.pointer_size + address, arr[hit]
+
+    def find(self, vtables: int | typing.Iterable[int]):
+        # sorted addresses of the objects whose vtable is one of vtables
+        if isinstance(vtables, int): vtables = (vtables,)
+        res = [addresses for addresses, _ in self.iter_matches(vtables)]
+        return np.concatenate(res) if res else np.zeros(0, np.uint64)
+
+    def find_grouped(self, vtables: typing.Iterable[int]) -> dict[int, list[int]]:
+        # addresses of the objects by their vtable
+        vtables = list(vtables)
+        res = {vtable: [] for vtable in vtables}
+        for addresses, values in self.iter_matches(vtables):
+            for address, value in zip(addresses.tolist(), values.tolist()):
+                res[value].append(address)
+        return res
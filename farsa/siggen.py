@@ -0,0 +1,187 @@
+import hashlib
+import typing
+
+from .pattern import SectionRange
+from .xref import XrefIndex, RIP
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if typing.TYPE_CHECKING:
+    from .cache import ModuleCache
+
+IMAGE_DIRECTORY_ENTRY_BASERELOC = 5
+IMAGE_REL_BASED_HIGHLOW = 3
+IMAGE_REL_BASED_DIR64 = 10
+
+
+def read_grams(arr):
+    # little endian uint32 of the 4 bytes at every position
+    arr = arr.astype(np.uint32)
+    return arr[:-3] | arr[1:-2] << 8 | arr[2:-1] << 16 | arr[3:] << 24
+
+
+class GramIndex:
+    # every 4 bytes gram in the sections as (gram, file offset) sorted by gram, a lighter suffix array
+    # that gives the occurrences of any 4 literal bytes with a binary search
+    def __init__(self, grams, positions):
+        if np is None: raise ImportError('numpy is required by the gram index')
+        self.grams = grams
+        self.positions = positions
+
+    @classmethod
+    def from_pe(cls, pe, sections: list[SectionRange]):
+        if np is None: raise ImportError('numpy is required by the gram index')
+        grams, positions = [], []
+        for sect in sections:
+            if sect.size < 4: continue
+            grams.append(read_grams(np.frombuffer(pe.__data__, dtype=np.uint8, count=sect.size, offset=sect.offset)))
+            positions.append(np.arange(sect.offset, sect.offset + sect.size - 3, dtype=np.uint32))
+        if not grams: return cls(np.zeros(0, np.uint32), np.zeros(0, np.uint32))
+        grams = np.concatenate(grams)
+        order = np.argsort(grams, kind='stable')
+        return cls(grams[order], np.concatenate(positions)[order])
+
+    def arrays(self):
+        return {'grams': self.grams, 'positions': self.positions}
+
+    def _range(self, gram: int):
+        return np.searchsorted(self.grams, gram, 'left'), np.searchsorted(self.grams, gram, 'right')
+
+    def count(self, gram: int) -> int:
+        start, end = self._range(gram)
+        return end - start
+
+    def find(self, gram: int):
+        # file offsets of the gram
+        start, end = self._range(gram)
+        return self.positions[start:end].astype(np.int64)
+
+
+def reloc_fields(pe) -> list[tuple[int, int]]:
+    # sorted (rva, size) of the fields patched by the base relocations
+    directory = pe.OPTIONAL_HEADER.DATA_DIRECTORY[IMAGE_DIRECTORY_ENTRY_BASERELOC]
+    if not directory.VirtualAddress or not directory.Size: return []
+    data = pe.get_data(directory.VirtualAddress, directory.Size)
+    res = []
+    pos = 0
+    while pos + 8 <= len(data):
+        va = int.from_bytes(data[pos:pos + 4], 'little')
+        size = int.from_bytes(data[pos + 4:pos + 8], 'little')
+        if size < 8: break
+        entries = np.frombuffer(data, dtype='<u2', count=min(size, len(data) - pos) - 8 >> 1, offset=pos + 8)
+        for entry_type, field_size in ((IMAGE_REL_BASED_HIGHLOW, 4), (IMAGE_REL_BASED_DIR64, 8)):
+            res.extend((va + int(off), field_size) for off in entries[entries >> 12 == entry_type] & 0xfff)
+        pos += size
+    res.sort()
+    return res
+
+
+class SigMaker:
+    # makes the shortest signature unique in the sections, rel32 / rip disp32 operands and relocated fields
+    # are wildcarded since they change on every build
+    def __init__(self, pe, sections: list[SectionRange], scope: str = '', cache: 'ModuleCache' = None):
+        if np is None: raise ImportError('numpy is required by the signature maker')
+        self.pe = pe
+        self.sections = sections
+        self.scope = scope
+        self.cache = cache
+        self._grams = self._xrefs = self._relocs = None
+
+    @property
+    def data(self):
+        return np.frombuffer(self.pe.__data__, dtype=np.uint8)
+
+    @property
+    def grams(self) -> GramIndex:
+        if self._grams is None:
+            file_name = f'grams_{hashlib.sha1(self.scope.encode()).hexdigest()[:8]}.npz' if self.scope else 'grams.npz'
+            if self.cache is not None and (arrays := self.cache.load_arrays(file_name)) is not None:
+                self._grams = GramIndex(**arrays)
+            else:
+                self._grams = GramIndex.from_pe(self.pe, self.sections)
+                if self.cache is not None: self.cache.save_arrays(file_name, self._grams.arrays())
+        return self._grams
+
+    @property
+    def xrefs(self) -> XrefIndex:
+        if self._xrefs is None:
+            self._xrefs = XrefIndex.from_pe(self.pe, self.sections)
+        return self._xrefs
+
+    @property
+    def relocs(self) -> list[tuple[int, int]]:
+        if self._relocs is None:
+            self._relocs = reloc_fields(self.pe)
+        return self._relocs
+
+    def file_range(self, rva: int):
+        # (file offset, file offset of the section end) of rva
+        for sect in self.sections:
+            if sect.virtual_address <= rva < sect.virtual_address + sect.size:
+                return sect.offset + rva - sect.virtual_address, sect.offset + sect.size
+        raise ValueError(f'rva {rva:#x} is not in the scanned sections')
+
+    def operand_field(self, source: int, kind: int):
+        # rva of the rel32 / disp32 field of the reference from source
+        if kind != RIP: return source + 1
+        return source + (3 if self.pe.get_data(source, 1) == b'\x0f' else 2)
+
+    def mask(self, rva: int, size: int):
+        # which bytes of [rva, rva + size) are stable between builds
+        mask = np.ones(size, dtype=bool)
+        for source, target, kind in self.xrefs.refs_from(rva - 7, rva + size):
+            field = self.operand_field(source, kind) - rva
+            mask[max(field, 0):max(field + 4, 0)] = False
+        for field_rva, field_size in self.relocs:
+            if field_rva >= rva + size: break
+            if field_rva + field_size > rva:
+                mask[max(field_rva - rva, 0):field_rva + field_size - rva] = False
+        return mask
+
+    def shortest(self, offset: int, values, mask) -> int | None:
+        # length of the shortest prefix of (values, mask) only matches at offset
+        data = self.data
+        grams = self.grams
+        candidates = None
+        for k in range(len(values)):
+            if k >= 3 and mask[k - 3:k + 1].all():
+                gram = int.from_bytes(bytes(values[k - 3:k + 1]), 'little')
+                if candidates is None or grams.count(gram) < len(candidates):
+                    candidates = grams.find(gram) - (k - 3)
+                    candidates = candidates[(candidates >= 0) & (candidates + len(values) <= len(data))]
+                    for j in np.flatnonzero(mask[:k + 1]):
+                        candidates = candidates[data[candidates + j] == values[j]]
+            elif candidates is not None and mask[k]:
+                candidates = candidates[data[candidates + k] == values[k]]
+            if candidates is not None and len(candidates) <= 1:
+                return k + 1 if len(candidates) == 1 and candidates[0] == offset else None
+        return None
+
+    def make(self, rva: int, max_length: int = 0x40, capture: int = None) -> str | None:
+        # shortest unique signature starting at rva, the 4 bytes at capture (relative to rva) are emitted as * * * *
+        offset, end = self.file_range(rva)
+        size = min(max_length, end - offset)
+        values = self.data[offset:offset + size]
+        mask = self.mask(rva, size)
+        if (length := self.shortest(offset, values, mask)) is None: return None
+        tokens = [f'{v:02X}' if m else '??' for v, m in zip(values[:length].tolist(), mask[:length])]
+        if capture is not None:
+            tokens.extend('??' for _ in range(capture + 4 - len(tokens)))
+            tokens[capture:capture + 4] = ['*'] * 4
+        return ' '.join(tokens)
+
+    def make_ref(self, rva: int, max_length: int = 0x40) -> str | None:
+        # shortest unique signature of an instruction referencing rva, its * * * * group resolves to rva
+        res = None
+        for source in self.xrefs.refs_to(rva):
+            for _source, target, kind in self.xrefs.refs_from(source, source + 1):
+                if target != rva: continue
+                field = self.operand_field(source, kind)
+                # the point of a * group is the end of the field plus its value, skip the operands followed by an immediate
+                if field + 4 + int.from_bytes(self.pe.get_data(field, 4), 'little', signed=True) != rva: continue
+                if (sig := self.make(source, max_length, field - source)) and (res is None or len(sig) < len(res)):
+                    res = sig
+        return res
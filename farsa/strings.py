@@ -0,0 +1,87 @@
+import bisect
+import re
+
+from .pattern import SectionRange, section_ranges, SCN_CNT_INITIALIZED_DATA, SCN_MEM_EXECUTE
+from .siggen import reloc_fields
+from .xref import XrefIndex, RIP, PTR
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ascii_pattern = re.compile(rb'[\x20-\x7e\t\r\n]{4,}(?=\x00)')
+utf16_pattern = re.compile(rb'(?:[\x20-\x7e\t\r\n]\x00){4,}(?=\x00\x00)')
+
+
+def data_sections(pe) -> list[SectionRange]:
+    # initialized data sections which are not code, eg. .rdata / .data
+    code = {sect.virtual_address for sect in section_ranges(pe, characteristics=SCN_MEM_EXECUTE)}
+    return [sect for sect in section_ranges(pe, characteristics=SCN_CNT_INITIALIZED_DATA) if sect.virtual_address not in code]
+
+
+def iter_strings(pe, sections: list[SectionRange]):
+    # yield (rva, is_utf16, text) of the null terminated strings
+    data = pe.__data__
+    for sect in sections:
+        va = sect.virtual_address - sect.offset
+        for match in ascii_pattern.finditer(data, sect.offset, sect.offset + sect.size):
+            yield match.start() + va, False, match.group().decode('ascii')
+        for match in utf16_pattern.finditer(data, sect.offset, sect.offset + sect.size):
+            yield match.start() + va, True, match.group().decode('utf-16-le')
+
+
+class StringIndex:
+    # strings of the data sections and the code / pointers referencing them, all in rva
+    def __init__(self, strings: list[tuple[int, bool, str]], refs: list[tuple[int, int, int]]):
+        self.strings = strings  # (rva, is_utf16, text)
+        self.refs = refs  # (string rva, source rva, kind), sorted by string rva
+        self.by_text: dict[str, list[int]] = {}
+        for rva, is_utf16, text in strings:
+            self.by_text.setdefault(text, []).append(rva)
+        self.texts = sorted(self.by_text)
+        self._ref_rvas = [rva for rva, source, kind in refs]
+
+    @classmethod
+    def from_pe(cls, pe, code_sections: list[SectionRange] = None, xrefs: XrefIndex = None):
+        if code_sections is None: code_sections = section_ranges(pe, characteristics=SCN_MEM_EXECUTE)
+        if xrefs is None: xrefs = XrefIndex.from_pe(pe, code_sections)
+        strings = list(iter_strings(pe, data_sections(pe)))
+        rvas = {rva for rva, is_utf16, text in strings}
+        hit = np.isin(xrefs.targets, np.array(sorted(rvas), dtype=np.uint32)) & (xrefs.kinds == RIP)
+        refs = [(rva, source, RIP) for rva, source in zip(xrefs.targets[hit].tolist(), xrefs.sources[hit].tolist())]
+        # absolute pointers are relocated fields holding image base + rva
+        image_base = pe.OPTIONAL_HEADER.ImageBase
+        for field, size in reloc_fields(pe):
+            if (rva := int.from_bytes(pe.get_data(field, size), 'little') - image_base) in rvas:
+                refs.append((rva, field, PTR))
+        refs.sort()
+        return cls(strings, refs)
+
+    def to_json(self):
+        return {'strings': self.strings, 'refs': self.refs}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls([tuple(s) for s in data['strings']], [tuple(r) for r in data['refs']])
+
+    def find(self, text: str) -> list[int]:
+        # rva of the strings equal to text
+        return self.by_text.get(text, [])
+
+    def iter_prefix(self, prefix: str):
+        # yield the indexed texts starting with prefix
+        i = bisect.bisect_left(self.texts, prefix)
+        while i < len(self.texts) and self.texts[i].startswith(prefix):
+            yield self.texts[i]
+            i += 1
+
+    def refs_to(self, rva: int, kind: int = None) -> list[int]:
+        # source rva of the references to the string at rva
+        i = bisect.bisect_left(self._ref_rvas, rva)
+        j = bisect.bisect_right(self._ref_rvas, rva, i)
+        return [source for _, source, _kind in self.refs[i:j] if kind is None or _kind == kind]
+
+    def find_refs(self, text: str, kind: int = None) -> list[int]:
+        # source rva of the references to any string equal to text
+        return [source for rva in self.find(text) for source in self.refs_to(rva, kind)]
@@ -2,9 +2,8 @@ import _ctypes
 import ctypes
 from inspect import isclass
 from typing import TypeVar, TYPE_CHECKING, Type
-from farsa.struct.base import MemStruct, Field, get_data, ShiftField, Enum
-from farsa.winapi import kernel32, structure
-from ..exception import WinAPIError
+from .base import MemStruct, Field, get_data, ShiftField, Enum
+from ..winapi import structure
 
 if TYPE_CHECKING:
     from .. import Process
@@ -12,6 +11,11 @@ if TYPE_CHECKING:
 _t = TypeVar('_t')
 
 
+def field_buffer(instance, offset: int, size: int):
+    # the bytes of the local buffer of a struct a remote field is read into / written from
+    return (ctypes.c_ubyte * size).from_address(ctypes.addressof(instance) + offset)
+
+
 class Remote:
     def __init__(self, process: 'Process', address: int):
         self.process = process
@@ -34,15 +38,8 @@ class RemoteField(Field):
                 return self.d_type(remote=instance.remote.copy(address))
             except TypeError:
                 pass
-        if kernel32.ReadProcessMemory(
-                instance.remote.process.handle,
-                address,
-                ctypes.addressof(instance) + self.offset,
-                ctypes.sizeof(self.d_type),
-                None
-        ):
-            return Field.__get__(self, instance, owner)
-        raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+        instance.remote.process.source.read_into(address, field_buffer(instance, self.offset, ctypes.sizeof(self.d_type)))
+        return Field.__get__(self, instance, owner)
 
     def __set__(self, instance: 'RemoteMemStruct', value: _t) -> None:
         if instance is None: return
@@ -50,14 +47,10 @@ class RemoteField(Field):
             update_remote_struct_buffer(value)
         Field.__set__(self, instance, value)
         # print(f"write {instance.remote.address + self.offset:x} from {ctypes.addressof(instance) + self.offset:x}")
-        if not kernel32.WriteProcessMemory(
-                instance.remote.process.handle,
-                instance.remote.address + self.offset,
-                ctypes.addressof(instance) + self.offset,
-                ctypes.sizeof(self.d_type),
-                None
-        ):
-            raise WinAPIError(kernel32.GetLastError(), "WriteProcessMemory")
+        instance.remote.process.source.write(
+            instance.remote.address + self.offset,
+            field_buffer(instance, self.offset, ctypes.sizeof(self.d_type))
+        )
 
 
 class RemoteShiftField(ShiftField):
@@ -68,28 +61,17 @@ class RemoteShiftField(ShiftField):
     def __get__(self, instance: 'RemoteMemStruct', owner) -> _t:
         if instance is None: return self
         address = instance.remote.address + self.offset
-        if kernel32.ReadProcessMemory(
-                instance.remote.process.handle,
-                address,
-                ctypes.addressof(instance) + self.offset,
-                ctypes.sizeof(self.d_type),
-                None
-        ):
-            return ShiftField.__get__(self, instance, owner)
-        raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+        instance.remote.process.source.read_into(address, field_buffer(instance, self.offset, ctypes.sizeof(self.d_type)))
+        return ShiftField.__get__(self, instance, owner)
 
     def __set__(self, instance: 'RemoteMemStruct', value: _t) -> None:
         if instance is None: return
         ShiftField.__set__(self, instance, value)
         # print(f"write {instance.remote.address + self.offset:x} from {ctypes.addressof(instance) + self.offset:x}")
-        if not kernel32.WriteProcessMemory(
-                instance.remote.process.handle,
-                instance.remote.address + self.offset,
-                ctypes.addressof(instance) + self.offset,
-                ctypes.sizeof(self.d_type),
-                None
-        ):
-            raise WinAPIError(kernel32.GetLastError(), "WriteProcessMemory")
+        instance.remote.process.source.write(
+            instance.remote.address + self.offset,
+            field_buffer(instance, self.offset, ctypes.sizeof(self.d_type))
+        )
 
 
 class RemoteMemStruct(MemStruct):
@@ -169,18 +151,12 @@ class RemoteArray(RemoteMemStruct):
     def __getitem__(self, item) -> _t:
         if isinstance(item, int):
             address = self.remote.address + item * ctypes.sizeof(self._type_)
-            if kernel32.ReadProcessMemory(
-                    self.remote.process.handle,
-                    address,
-                    ctypes.addressof(self) + item * ctypes.sizeof(self._type_),
-                    ctypes.sizeof(self._type_),
-                    None
-            ):
-                d = self.remote.process.read(self._type_, address)
-                if isinstance(d, RemoteMemStruct):
-                    d.remote = self.remote.copy(address)
-                return d
-            raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+            size = ctypes.sizeof(self._type_)
+            self.remote.process.source.read_into(address, field_buffer(self, item * size, size))
+            d = self.remote.process.read(self._type_, address)
+            if isinstance(d, RemoteMemStruct):
+                d.remote = self.remote.copy(address)
+            return d
         elif isinstance(item, slice):
             return [self[i] for i in range(*item.indices(self._length_))]
         raise TypeError("Only integer indexing is supported")
@@ -222,14 +198,7 @@ class RemoteArray(RemoteMemStruct):
 
 
 def update_remote_struct_buffer(remote_struct: RemoteMemStruct):
-    if not kernel32.ReadProcessMemory(
-            remote_struct.remote.process.handle,
-            remote_struct.remote.address,
-            ctypes.addressof(remote_struct),
-            ctypes.sizeof(remote_struct),
-            None
-    ):
-        raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+    remote_struct.remote.process.source.read_into(remote_struct.remote.address, remote_struct)
 
 
 def to_remote_type(t: Type[_t]) -> Type[_t]:
@@ -1,8 +1,15 @@
+import threading
 from ctypes import *
 from ctypes.wintypes import *
 from typing import TypeVar, Type, Callable
-from ..winapi import structure, kernel32
+from ..winapi import structure
 from ..exception import WinAPIError
+from .source import as_source, read_handle_into, read_process_memory, MemorySource, PAGE_GUARD
+
+try:
+    from ..winapi import kernel32
+except Exception:
+    kernel32 = None
 
 
 def alloc(
@@ -24,78 +31,146 @@ def alloc(
     return address
 
 
-def iter_memory_region(handle, start=0, end=None):
-    pos = start
-    mbi = structure.MEMORY_BASIC_INFORMATION()
-    size = sizeof(structure.MEMORY_BASIC_INFORMATION)
-    while kernel32.VirtualQueryEx(
-            handle,
-            pos,
-            byref(mbi),
-            sizeof(mbi)
-    ) == size:
-        if mbi.Protect & 256 != 256 and mbi.Protect & 4 == 4:
-            yield mbi.BaseAddress, mbi.RegionSize
-        next_addr = mbi.BaseAddress + mbi.RegionSize
-        if pos >= next_addr or end is not None and end > next_addr: break
-        pos = next_addr
+READABLE_PROTECT = (
+        structure.MEMORY_PROTECTION.PAGE_READONLY.value |
+        structure.MEMORY_PROTECTION.PAGE_READWRITE.value |
+        structure.MEMORY_PROTECTION.PAGE_WRITECOPY.value |
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value |
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_READWRITE.value |
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_WRITECOPY.value
+)
+EXECUTABLE_PROTECT = (
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value |
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_READWRITE.value |
+        structure.MEMORY_PROTECTION.PAGE_EXECUTE_WRITECOPY.value
+)
+
+
+def iter_memory_region(handle, start=0, end=None, protect=structure.MEMORY_PROTECTION.PAGE_READWRITE.value):
+    # handle is a winapi handle or a MemorySource
+    for base, size, region_protect in as_source(handle).query_regions(start, end):
+        if region_protect & PAGE_GUARD != PAGE_GUARD and region_protect & protect:
+            yield base, size
+
+
+def iter_chunk_ranges(regions, start=0, end=None, chunk_size=0x100000, alignment=1, overlap=0):
+    # yield (address, limit, read end) of the chunks of the (base, size) regions clipped to [start, end),
+    # the chunks start aligned, what starts in [address, limit) belongs to the chunk and may run overlap bytes after it
+    for base, size in regions:
+        region_end = base + size if end is None else min(base + size, end)
+        address = max(base, start)
+        address += -address % alignment
+        while address < region_end:
+            limit = min(address + chunk_size, region_end)
+            yield address, limit, min(limit + overlap, region_end)
+            address = limit
+
+
+def iter_region_chunks(handle, start=0, end=None, protect=READABLE_PROTECT, chunk_size=0x100000, alignment=1, overlap=0, regions=None):
+    # yield (address, data, limit) of the chunks of iter_chunk_ranges, those can not be read are skipped;
+    # regions are the (base, size) to walk, default the regions of handle in protect
+    if regions is None: regions = iter_memory_region(handle, start, end, protect)
+    for address, limit, read_end in iter_chunk_ranges(regions, start, end, chunk_size, alignment, overlap):
+        try:
+            data = read_bytes(handle, address, read_end - address)
+        except WinAPIError:
+            continue
+        yield address, data, limit
 
 
 _t = TypeVar('_t')
+_scratch = threading.local()
+
+
+def scratch(d_type: Type[_t]) -> _t:
+    # a d_type instance of the current thread reused by the typed reads, valid until the next read of the type
+    if (buffers := getattr(_scratch, 'buffers', None)) is None: buffers = _scratch.buffers = {}
+    if (buf := buffers.get(d_type)) is None: buf = buffers[d_type] = d_type()
+    return buf
+
+
+def scratch_bytes(size: int) -> memoryview:
+    # size bytes of a c array of the current thread, only grown, valid until the next call;
+    # a c array so a winapi read needs no wrapper around it
+    if (buf := getattr(_scratch, 'bytes', None)) is None or len(buf) < size: buf = _scratch.bytes = (c_ubyte * max(size, 0x1000))()
+    return memoryview(buf).cast('B')[:size]
+
+
+def read_into(handle, address: int, buf: _t) -> _t:
+    # fill a writable buffer, bytearray / memoryview / numpy array / ctypes object, with the memory at address
+    read_handle_into(handle, address, buf)
+    return buf
+
+
+def read_scratch(handle, address: int, size: int) -> memoryview:
+    # bytes at address in the scratch buffer of the thread, copy them to keep after the next read
+    view = scratch_bytes(size)
+    if isinstance(handle, MemorySource):
+        handle.read_into(address, view)
+    else:
+        read_process_memory(handle, address, addressof(_scratch.bytes), size)
+    return view
+
+
+def read_value(handle, d_type: Type[_t], address: int):
+    # value of a simple d_type read into the scratch instance of the thread
+    buf = scratch(d_type)
+    read_handle_into(handle, address, buf)
+    return buf.value
 
 
 def read_memory(handle, d_type: Type[_t], address: int) -> _t:
     buf = d_type()
-    windll.kernel32.SetLastError(0)
-    if kernel32.ReadProcessMemory(
-            handle,
-            address,
-            byref(buf),
-            sizeof(buf),
-            None
-    ): return buf
-    raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+    read_handle_into(handle, address, buf)
+    return buf
 
 
 def write_memory(handle, address: int, data: _t) -> _t:
-    windll.kernel32.SetLastError(0)
-    if kernel32.WriteProcessMemory(
-            handle,
-            address,
-            byref(data),
-            sizeof(data),
-            None
-    ): return data
-    raise WinAPIError(kernel32.GetLastError(), "WriteProcessMemory")
+    as_source(handle).write(address, data)
+    return data
 
 
 def read_bytes(handle, address: int, size: int) -> bytearray:
     buf = bytearray(size)
-    _buf = (c_ubyte * size).from_buffer(buf)
-    windll.kernel32.SetLastError(0)
-    if kernel32.ReadProcessMemory(
-            handle,
-            address,
-            _buf,
-            size,
-            None
-    ): return buf
-    raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+    read_handle_into(handle, address, buf)
+    return buf
 
 
 def write_bytes(handle, address: int, data: bytearray | bytes) -> bytearray:
     if isinstance(data, bytes): data = bytearray(data)
-    size = len(data)
-    _buf = (c_ubyte * size).from_buffer(data)
-    windll.kernel32.SetLastError(0)
-    if kernel32.WriteProcessMemory(
-            handle,
-            address,
-            _buf,
-            size,
-            None
-    ): return data
-    raise WinAPIError(kernel32.GetLastError(), "WriteProcessMemory")
+    as_source(handle).write(address, data)
+    return data
+
+
+def read_many(handle, requests: list[tuple[int, int]], gap: int = 0x200, max_size: int = 0x10000) -> list[memoryview | None]:
+    # read every (address, size) with the fewest accesses, the ranges closer than gap are merged into one read
+    # of at most max_size bytes and sliced back as memoryviews; None where the memory can not be read
+    source = as_source(handle)
+    groups = []  # [start, end, request index]
+    for i in sorted(range(len(requests)), key=lambda i: requests[i][0]):
+        address, size = requests[i]
+        if groups and address <= groups[-1][1] + gap and max(groups[-1][1], address + size) - groups[-1][0] <= max_size:
+            groups[-1][1] = max(groups[-1][1], address + size)
+            groups[-1][2].append(i)
+        else:
+            groups.append([address, address + size, [i]])
+    bufs = [bytearray(end - start) for start, end, _ in groups]
+    res = [None] * len(requests)
+    retry = []
+    for (start, end, indexes), buf, ok in zip(groups, bufs, source.read_batch([(g[0], buf) for g, buf in zip(groups, bufs)])):
+        if ok:
+            view = memoryview(buf)
+            for i in indexes:
+                address, size = requests[i]
+                res[i] = view[address - start:address - start + size]
+        elif len(indexes) > 1:
+            # an unreadable page between the requests fails the merged read, they are read one by one
+            retry.extend(indexes)
+    if retry:
+        bufs = [bytearray(requests[i][1]) for i in retry]
+        for i, buf, ok in zip(retry, bufs, source.read_batch([(requests[i][0], buf) for i, buf in zip(retry, bufs)])):
+            if ok: res[i] = memoryview(buf)
+    return res
 
 
 num_size_map = {
@@ -115,7 +190,7 @@ def read_num_func(size: int, signed=True) -> Callable[[any, int], int]:
     d_type = num_size_map[size + signed]
 
     def func(handle, address: int) -> int:
-        return read_memory(handle, d_type, address).value
+        return read_value(handle, d_type, address)
 
     return func
 
@@ -131,7 +206,7 @@ def write_num_func(size: int, signed=True) -> Callable[[any, int, int], int]:
 
 
 def read_float(handle, address: int) -> float:
-    return read_memory(handle, c_float, address).value
+    return read_value(handle, c_float, address)
 
 
 def write_float(handle, address: int, value: float | int) -> float:
@@ -151,16 +226,67 @@ def write_string(handle, address: int, value: str | bytearray | bytes) -> bytear
     return write_bytes(handle, address, value)
 
 
-def read_string_safe(handle, address: int, max_length: int = 255, encoding='utf-8') -> str:
-    data = bytearray()
-    for i in range(max_length):
+PAGE_SIZE = 0x1000
+
+
+def char_size_of(encoding: str) -> int:
+    return 2 if encoding.lower().replace('_', '-').startswith(('utf-16', 'utf16')) else 1
+
+
+def find_terminator(data: bytearray, start: int, char_size: int) -> int:
+    # index of the first nul char from start, double nul aligned to the char for utf-16
+    if char_size == 1: return data.find(0, start)
+    i = data.find(b'\0\0', start)
+    while i != -1 and i % 2:
+        i = data.find(b'\0\0', i + 1)
+    return i
+
+
+def read_terminated(handle, address: int, max_size: int, char_size: int = 1, data: bytearray = None) -> bytearray:
+    # bytes at address before the nul terminator, read up to each page boundary at once and
+    # stopped at the first unreadable page; data is the part already read from address
+    source = as_source(handle)
+    if data is None: data = bytearray()
+    end = address + max_size
+    pos = address + len(data)
+    checked = 0
+    while True:
+        if (i := find_terminator(data, checked, char_size)) != -1: return data[:i]
+        checked = len(data) - len(data) % char_size
+        if pos >= end: break
+        size = min(PAGE_SIZE - pos % PAGE_SIZE, end - pos)
         try:
-            new_byte = read_ubyte(handle, address + i)
+            data += source.read(pos, size)
         except WinAPIError:
             break
-        if not new_byte: break
-        data.append(new_byte)
-    return data.decode(encoding)
+        pos += size
+    return data[:max_size - max_size % char_size]
+
+
+def read_string_safe(handle, address: int, max_length: int = 255, encoding='utf-8') -> str:
+    # string at address of at most max_length chars, cut at the first unreadable page
+    char_size = char_size_of(encoding)
+    return read_terminated(handle, address, max_length * char_size, char_size).decode(encoding)
+
+
+def read_strings_safe(handle, addresses: list[int], max_length: int = 255, encoding='utf-8', pointers=False) -> list[str]:
+    # read_string_safe of many strings, the first page part of every string is read by one batch of the source;
+    # with pointers the addresses are of the string pointers, read by read_many first
+    source = as_source(handle)
+    if pointers:
+        ptr_size = sizeof(c_void_p)
+        addresses = [
+            0 if view is None else int.from_bytes(view, 'little')
+            for view in read_many(source, [(address, ptr_size) for address in addresses])
+        ]
+    char_size = char_size_of(encoding)
+    max_size = max_length * char_size
+    requests = [(address, bytearray(min(PAGE_SIZE - address % PAGE_SIZE, max_size))) for address in addresses if address]
+    heads = {address: buf for (address, buf), ok in zip(requests, source.read_batch(requests)) if ok}
+    return [
+        read_terminated(source, address, max_size, char_size, heads[address]).decode(encoding)
+        if address in heads else '' for address in addresses
+    ]
 
 
 r_ui8 = read_uint8 = read_num_func(8, False)
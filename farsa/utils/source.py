@@ -0,0 +1,395 @@
+import ctypes
+import errno
+import os
+import time
+import typing
+from collections import OrderedDict
+
+from ..winapi import structure
+from ..exception import WinAPIError, MemoryAccessError
+
+try:
+    from ..winapi import kernel32
+except Exception:
+    kernel32 = None
+
+PAGE_GUARD = structure.MEMORY_PROTECTION.PAGE_GUARD.value
+IOV_MAX = 1024
+_c_types = (ctypes._SimpleCData, ctypes.Structure, ctypes.Union, ctypes.Array)
+
+# /proc/pid/maps permissions to the winapi protection, so the protect masks work on every source
+_perm_protect = {
+    '---': structure.MEMORY_PROTECTION.PAGE_NOACCESS.value,
+    'r--': structure.MEMORY_PROTECTION.PAGE_READONLY.value,
+    'rw-': structure.MEMORY_PROTECTION.PAGE_READWRITE.value,
+    '-w-': structure.MEMORY_PROTECTION.PAGE_READWRITE.value,
+    '--x': structure.MEMORY_PROTECTION.PAGE_EXECUTE.value,
+    'r-x': structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value,
+    'rwx': structure.MEMORY_PROTECTION.PAGE_EXECUTE_READWRITE.value,
+    '-wx': structure.MEMORY_PROTECTION.PAGE_EXECUTE_READWRITE.value,
+}
+
+
+def c_buffer(buf) -> ctypes.Array:
+    # c array sharing the memory of a writable buffer, bytearray / memoryview / ctypes object
+    return (ctypes.c_ubyte * memoryview(buf).nbytes).from_buffer(buf)
+
+
+def buffer_address(buf) -> tuple[int, int]:
+    # (address, size) of a writable buffer, ctypes objects and contiguous numpy arrays are used in place without a wrapper
+    if isinstance(buf, _c_types): return ctypes.addressof(buf), ctypes.sizeof(buf)
+    if (interface := getattr(buf, '__array_interface__', None)) is not None and interface['strides'] is None and not interface['data'][1]:
+        return interface['data'][0], buf.nbytes
+    _buf = c_buffer(buf)
+    return ctypes.addressof(_buf), len(_buf)
+
+
+def c_data(data) -> ctypes.Array:
+    # c array of the bytes of data, copied only when data is read only
+    try:
+        return c_buffer(data)
+    except TypeError:
+        return (ctypes.c_ubyte * memoryview(data).nbytes).from_buffer_copy(data)
+
+
+class MemorySource:
+    # where the memory of a process is read / written from, every access of Process and the remote structs
+    # goes through one; failed accesses raise WinAPIError, the batch variants return a success flag per request
+    def read_into(self, address: int, buf) -> None:
+        raise NotImplementedError()
+
+    def write(self, address: int, data) -> None:
+        raise NotImplementedError()
+
+    def query_regions(self, start: int = 0, end: int = None) -> typing.Iterator[tuple[int, int, int]]:
+        # yield (base, size, protect) of the regions from start to end, protect is a winapi MEMORY_PROTECTION
+        raise NotImplementedError()
+
+    def read(self, address: int, size: int) -> bytearray:
+        buf = bytearray(size)
+        self.read_into(address, buf)
+        return buf
+
+    def read_batch(self, requests: typing.Iterable[tuple[int, typing.Any]]) -> list[bool]:
+        # read_into of each (address, buf)
+        res = []
+        for address, buf in requests:
+            try:
+                self.read_into(address, buf)
+            except WinAPIError:
+                res.append(False)
+            else:
+                res.append(True)
+        return res
+
+    def write_batch(self, requests: typing.Iterable[tuple[int, typing.Any]]) -> list[bool]:
+        # write of each (address, data)
+        res = []
+        for address, data in requests:
+            try:
+                self.write(address, data)
+            except WinAPIError:
+                res.append(False)
+            else:
+                res.append(True)
+        return res
+
+    def reopen_args(self) -> tuple[typing.Callable, tuple] | None:
+        # (factory, args) opening the same memory in another process, None when it can not be reopened
+        return None
+
+    def close(self):
+        pass
+
+
+class WinApiSource(MemorySource):
+    def __init__(self, handle, owned=False):
+        self.handle = handle
+        self.owned = owned  # the handle is closed with the source
+
+    @classmethod
+    def open(cls, pid: int, access: int = None):
+        if access is None: access = structure.PROCESS.PROCESS_VM_READ.value | structure.PROCESS.PROCESS_QUERY_INFORMATION.value
+        handle = kernel32.OpenProcess(access, False, pid)
+        if not handle: raise WinAPIError(kernel32.GetLastError(), 'OpenProcess')
+        return cls(handle, True)
+
+    def read_into(self, address: int, buf) -> None:
+        read_process_memory(self.handle, address, *buffer_address(buf))
+
+    def write(self, address: int, data) -> None:
+        _data = c_data(data)
+        if not kernel32.WriteProcessMemory(self.handle, address, ctypes.addressof(_data), len(_data), None):
+            raise WinAPIError(kernel32.GetLastError(), "WriteProcessMemory")
+
+    def query_regions(self, start: int = 0, end: int = None):
+        pos = start
+        mbi = structure.MEMORY_BASIC_INFORMATION()
+        size = ctypes.sizeof(structure.MEMORY_BASIC_INFORMATION)
+        while kernel32.VirtualQueryEx(self.handle, pos, ctypes.byref(mbi), size) == size:
+            yield mbi.BaseAddress or 0, mbi.RegionSize, mbi.Protect
+            next_addr = (mbi.BaseAddress or 0) + mbi.RegionSize
+            if pos >= next_addr or end is not None and end <= next_addr: break
+            pos = next_addr
+
+    def reopen_args(self):
+        pid = kernel32.GetProcessId(self.handle)
+        return (WinApiSource.open, (pid,)) if pid else None
+
+    def close(self):
+        if self.owned and self.handle:
+            kernel32.CloseHandle(self.handle)
+            self.handle = None
+
+
+def read_process_memory(handle, address: int, ptr: int, size: int) -> None:
+    if not kernel32.ReadProcessMemory(handle, address, ptr, size, None):
+        raise WinAPIError(kernel32.GetLastError(), "ReadProcessMemory")
+
+
+def iter_proc_maps(pid: int, start: int = 0, end: int = None):
+    # (base, size, protect) of the mappings in /proc/pid/maps overlapping start to end
+    with open(f'/proc/{pid}/maps') as f:
+        for line in f:
+            _range, perms = line.split(None, 2)[:2]
+            base, limit = (int(v, 16) for v in _range.split('-'))
+            if limit <= start: continue
+            if end is not None and base >= end: break
+            yield base, limit - base, _perm_protect[perms[:3]]
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+_libc = None
+
+
+def libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        for name in ('process_vm_readv', 'process_vm_writev'):
+            func = getattr(_libc, name)
+            func.argtypes = [ctypes.c_int, ctypes.POINTER(_iovec), ctypes.c_ulong, ctypes.POINTER(_iovec), ctypes.c_ulong, ctypes.c_ulong]
+            func.restype = ctypes.c_ssize_t
+    return _libc
+
+
+class ProcessVmSource(MemorySource):
+    # linux process_vm_readv / process_vm_writev, a batch is copied by one syscall per IOV_MAX requests
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._readv = libc().process_vm_readv
+        self._writev = libc().process_vm_writev
+
+    def _transfer(self, func, name: str, requests: list[tuple[int, ctypes.Array]]) -> list[bool]:
+        res = [False] * len(requests)
+        i = 0
+        while i < len(requests):
+            part = requests[i:i + IOV_MAX]
+            local = (_iovec * len(part))(*((ctypes.addressof(buf), len(buf)) for _, buf in part))
+            remote = (_iovec * len(part))(*((address, len(buf)) for address, buf in part))
+            n = func(self.pid, local, len(part), remote, len(part), 0)
+            if n < 0:
+                err = ctypes.get_errno()
+                if err not in (errno.EFAULT, errno.EIO): raise MemoryAccessError(part[0][0], len(part[0][1]), name, err)
+                n = 0
+            # the copy stops at the first request can not be accessed, the ones after are tried again
+            for address, buf in part:
+                if n < len(buf): break
+                n -= len(buf)
+                res[i] = True
+                i += 1
+            else:
+                continue
+            i += 1
+        return res
+
+    def read_into(self, address: int, buf) -> None:
+        ptr, size = buffer_address(buf)
+        if self._readv(self.pid, ctypes.byref(_iovec(ptr, size)), 1, ctypes.byref(_iovec(address, size)), 1, 0) != size:
+            raise MemoryAccessError(address, size, 'process_vm_readv', ctypes.get_errno())
+
+    def write(self, address: int, data) -> None:
+        _data = c_data(data)
+        if not self._transfer(self._writev, 'process_vm_writev', [(address, _data)])[0]:
+            raise MemoryAccessError(address, len(_data), 'process_vm_writev', errno.EFAULT)
+
+    def read_batch(self, requests):
+        return self._transfer(self._readv, 'process_vm_readv', [(address, c_buffer(buf)) for address, buf in requests])
+
+    def write_batch(self, requests):
+        return self._transfer(self._writev, 'process_vm_writev', [(address, c_data(data)) for address, data in requests])
+
+    def query_regions(self, start: int = 0, end: int = None):
+        return iter_proc_maps(self.pid, start, end)
+
+    def reopen_args(self):
+        return ProcessVmSource, (self.pid,)
+
+
+class ProcMemSource(MemorySource):
+    # linux /proc/pid/mem file, pread / pwrite at the address as offset
+    def __init__(self, pid: int, writable=True):
+        self.pid = pid
+        self.fd = os.open(f'/proc/{pid}/mem', os.O_RDWR if writable else os.O_RDONLY)
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        try:
+            n = os.preadv(self.fd, [view], address)
+        except (OSError, OverflowError) as e:
+            raise MemoryAccessError(address, len(view), 'pread', getattr(e, 'errno', None) or 0) from None
+        if n != len(view): raise MemoryAccessError(address, len(view), 'pread', errno.EIO)
+
+    def write(self, address: int, data) -> None:
+        view = memoryview(data).cast('B')
+        try:
+            n = os.pwrite(self.fd, view, address)
+        except (OSError, OverflowError) as e:
+            raise MemoryAccessError(address, len(view), 'pwrite', getattr(e, 'errno', None) or 0) from None
+        if n != len(view): raise MemoryAccessError(address, len(view), 'pwrite', errno.EIO)
+
+    def query_regions(self, start: int = 0, end: int = None):
+        return iter_proc_maps(self.pid, start, end)
+
+    def reopen_args(self):
+        return ProcMemSource, (self.pid, False)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __del__(self):
+        self.close()
+
+
+class BufferSource(MemorySource):
+    # memory of a bytearray mapped at base, a single region of protect; for tests and offline dumps
+    def __init__(self, data: bytearray, base: int = 0, protect: int = structure.MEMORY_PROTECTION.PAGE_READWRITE.value):
+        self.data = data if isinstance(data, bytearray) else bytearray(data)
+        self.base = base
+        self.protect = protect
+
+    def _offset(self, address: int, size: int, func_name: str) -> int:
+        offset = address - self.base
+        if offset < 0 or offset + size > len(self.data): raise MemoryAccessError(address, size, func_name, errno.EFAULT)
+        return offset
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        offset = self._offset(address, len(view), 'read_into')
+        view[:] = self.data[offset:offset + len(view)]
+
+    def write(self, address: int, data) -> None:
+        view = memoryview(data).cast('B')
+        offset = self._offset(address, len(view), 'write')
+        self.data[offset:offset + len(view)] = view
+
+    def query_regions(self, start: int = 0, end: int = None):
+        if self.base + len(self.data) > start and (end is None or self.base < end):
+            yield self.base, len(self.data), self.protect
+
+
+class PageCacheSource(MemorySource):
+    # whole pages of another source kept until the next tick or for ttl seconds, the least recently used ones are
+    # dropped over max_bytes; writes go to the source and drop the pages they touch, reads over bypass_size are not cached
+    def __init__(self, source: MemorySource, max_bytes: int = 0x1000000, ttl: float = None, page_size: int = 0x1000, bypass_size: int = 0x10000):
+        self.source = source
+        self.page_size = page_size
+        self.max_pages = max(2, max_bytes // page_size)  # a read under bypass_size spans at most max_pages pages
+        self.ttl = ttl
+        self.bypass_size = min(bypass_size, self.max_pages * page_size // 2)
+        self.pages: OrderedDict[int, tuple[bytearray, float]] = OrderedDict()  # page number -> (data, load time)
+        self.generation = 0
+
+    def tick(self) -> int:
+        # drop every page, called once per frame / poll of the reader
+        self.generation += 1
+        self.pages.clear()
+        return self.generation
+
+    def _page_numbers(self, address: int, size: int):
+        return range(address // self.page_size, (address + size - 1) // self.page_size + 1)
+
+    def _load(self, page_numbers: typing.Iterable[int]) -> bool:
+        # make the pages cached, false if any of them can not be read
+        now = time.monotonic() if self.ttl is not None else 0
+        missing = []
+        for page in page_numbers:
+            if (cached := self.pages.get(page)) is not None and (self.ttl is None or now - cached[1] <= self.ttl):
+                self.pages.move_to_end(page)
+            else:
+                missing.append(page)
+        if not missing: return True
+        bufs = [bytearray(self.page_size) for _ in missing]
+        res = True
+        for page, buf, ok in zip(missing, bufs, self.source.read_batch([(page * self.page_size, buf) for page, buf in zip(missing, bufs)])):
+            if ok:
+                self.pages[page] = buf, now
+                self.pages.move_to_end(page)
+            else:
+                res = False
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        return res
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        size = len(view)
+        if not size: return
+        if size > self.bypass_size or not self._load(pages := self._page_numbers(address, size)):
+            # too large to cache, or a page can not be read as a whole
+            return self.source.read_into(address, view)
+        if any(page not in self.pages for page in pages):
+            # evicted by the load itself, not expected as the read is under half the budget
+            return self.source.read_into(address, view)
+        pos = 0
+        for page in pages:
+            data = self.pages[page][0]
+            offset = address + pos - page * self.page_size
+            n = min(self.page_size - offset, size - pos)
+            view[pos:pos + n] = data[offset:offset + n]
+            pos += n
+
+    def read_batch(self, requests):
+        # the missing pages of every request are read by one batch of the source
+        requests = list(requests)
+        self._load(sorted({
+            page for address, buf in requests if 0 < (size := memoryview(buf).nbytes) <= self.bypass_size
+            for page in self._page_numbers(address, size)
+        }))
+        return super().read_batch(requests)
+
+    def write(self, address: int, data) -> None:
+        size = memoryview(data).nbytes
+        try:
+            self.source.write(address, data)
+        finally:
+            for page in self._page_numbers(address, size) if size else ():
+                self.pages.pop(page, None)
+
+    def query_regions(self, start: int = 0, end: int = None):
+        return self.source.query_regions(start, end)
+
+    def reopen_args(self):
+        return self.source.reopen_args()
+
+    def close(self):
+        self.pages.clear()
+        self.source.close()
+
+
+def as_source(handle) -> MemorySource:
+    # a winapi handle is wrapped, a MemorySource is used as is
+    return handle if isinstance(handle, MemorySource) else WinApiSource(handle)
+
+
+def read_handle_into(handle, address: int, buf) -> None:
+    # as_source(handle).read_into, a winapi handle is read without wrapping it
+    if isinstance(handle, MemorySource):
+        handle.read_into(address, buf)
+    else:
+        read_process_memory(handle, address, *buffer_address(buf))
@@ -43,6 +43,13 @@ GetCurrentProcess.restype = ctypes.c_long
 GetCurrentProcessId = dll.GetCurrentProcessId
 GetCurrentProcessId.restype = ctypes.c_ulong
 
+#: Retrieves the process identifier of the specified process.
+#:
+#: https://docs.microsoft.com/en-us/windows/win32/api/processthreadsapi/nf-processthreadsapi-getprocessid
+GetProcessId = dll.GetProcessId
+GetProcessId.argtypes = [ctypes.wintypes.HANDLE]
+GetProcessId.restype = ctypes.c_ulong
+
 #: Reads data from an area of memory in a specified process. The entire area to be read must be accessible or the operation fails.
 #:
 #: https://msdn.microsoft.com/en-us/library/windows/desktop/ms680553%28v=vs.85%29.aspx
@@ -4,7 +4,10 @@ import struct
 
 import ctypes
 
-from . import psapi, ntdll
+try:
+    from . import psapi, ntdll
+except Exception:  # not on windows, the structures are still usable
+    psapi = ntdll = None
 
 DEFAULT_CODING = locale.getpreferredencoding()
 if ctypes.sizeof(ctypes.c_void_p) == 4:
@@ -523,7 +526,7 @@ class CLIENT_ID(ctypes.Structure):
 
 class THREAD_BASIC_INFORMATION(ctypes.Structure):
     _fields_ = [
-        ("ExitStatus", ntdll.NTSTATUS),
+        ("ExitStatus", ctypes.c_ulong),  # NTSTATUS
         ("TebBaseAddress", ctypes.c_void_p),
         ("ClientId", CLIENT_ID),
         ("AffinityMask", ctypes.c_long),
@@ -0,0 +1,141 @@
+import typing
+
+from .pattern import SectionRange, section_ranges, SCN_MEM_EXECUTE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CALL = 1  # e8 rel32
+JMP = 2  # e9 rel32
+RIP = 3  # [rip + disp32] operand, the absolute [disp32] one in a pe32 image
+PTR = 4  # absolute pointer, a relocated field
+
+# opcodes taking a modrm operand which may be rip relative, opcode -> size of the immediate after the disp32
+rip_opcodes = {
+    **{op: 0 for op in (
+        0x01, 0x03, 0x09, 0x0b, 0x11, 0x13, 0x19, 0x1b, 0x21, 0x23, 0x29, 0x2b, 0x31, 0x33, 0x39, 0x3b,
+        0x63, 0x84, 0x85, 0x86, 0x87, 0x88, 0x89, 0x8a, 0x8b, 0x8d, 0xfe, 0xff,
+    )},
+    0x80: 1, 0x83: 1, 0xc6: 1, 0x81: 4, 0xc7: 4,
+}
+rip_opcodes_0f = {op: 0 for op in (
+    0x10, 0x11, 0x28, 0x29, 0x2e, 0x2f, 0x51, 0x54, 0x57, 0x58, 0x59, 0x5c, 0x5e,
+    0x6e, 0x6f, 0x7e, 0x7f, 0xb6, 0xb7, 0xbe, 0xbf, 0xd6,
+)}
+
+
+def read_i32(arr, pos):
+    # little endian int32 at every position of pos
+    res = arr[pos].astype(np.int64) | arr[pos + 1].astype(np.int64) << 8 | arr[pos + 2].astype(np.int64) << 16 | arr[pos + 3].astype(np.int64) << 24
+    return (res ^ 0x80000000) - 0x80000000
+
+
+def code_ranges(pe) -> list[tuple[int, int]]:
+    # (rva, rva end) of the executable sections, the valid call / jump targets
+    return sorted(
+        (sect.VirtualAddress, sect.VirtualAddress + max(sect.Misc_VirtualSize, sect.SizeOfRawData))
+        for sect in pe.sections if sect.Characteristics & SCN_MEM_EXECUTE
+    )
+
+
+def in_ranges(values, ranges: list[tuple[int, int]]):
+    res = np.zeros(len(values), dtype=bool)
+    for start, end in ranges:
+        res |= (values >= start) & (values < end)
+    return res
+
+
+def scan_section(pe, sect: SectionRange, targets_ranges: list[tuple[int, int]], image_size: int, image_base: int = None):
+    # (sources, targets, kinds) in rva, candidates are decoded at every byte so there are false positives
+    # out of instruction boundary, the targets are bounded to code for branches and to the image for rip operands;
+    # with image_base the code is x86, where mod 00 rm 101 is an absolute [disp32] instead of rip relative
+    arr = np.frombuffer(pe.__data__, dtype=np.uint8, count=sect.size, offset=sect.offset)
+    sources, targets, kinds = [], [], []
+
+    for op, kind in ((0xe8, CALL), (0xe9, JMP)):
+        pos = np.flatnonzero(arr[:-4] == op)
+        target = read_i32(arr, pos + 1) + pos + 5 + sect.virtual_address
+        valid = in_ranges(target, targets_ranges)
+        sources.append(pos[valid])
+        targets.append(target[valid])
+        kinds.append(np.full(valid.sum(), kind, dtype=np.uint8))
+
+    modrm = np.flatnonzero((arr[1:-4] & 0xc7) == 5) + 1  # mod 00 rm 101
+    for table, size in ((rip_opcodes, 1), (rip_opcodes_0f, 2)):
+        pos = modrm[modrm >= size] - size
+        opcodes = [op for op in table if not (image_base is not None and size == 1 and op == 0x63)]  # arpl on x86
+        valid = np.isin(arr[pos + size - 1], np.array(opcodes, dtype=np.uint8))
+        if size == 2: valid &= arr[pos] == 0x0f
+        pos = pos[valid]
+        imm = np.zeros(256, dtype=np.int64)
+        for op, imm_size in table.items(): imm[op] = imm_size
+        disp = pos + size + 1
+        if image_base is None:
+            target = read_i32(arr, disp) + disp + 4 + imm[arr[pos + size - 1]] + sect.virtual_address
+        else:
+            target = (read_i32(arr, disp) & 0xffffffff) - image_base
+        valid = (target >= 0) & (target < image_size)
+        sources.append(pos[valid])
+        targets.append(target[valid])
+        kinds.append(np.full(valid.sum(), RIP, dtype=np.uint8))
+
+    return (
+        np.concatenate(sources).astype(np.uint32) + sect.virtual_address,
+        np.concatenate(targets).astype(np.uint32),
+        np.concatenate(kinds),
+    )
+
+
+class XrefIndex:
+    # every reference as (source rva, target rva, kind), sorted by target then source,
+    # the source is the rva of the opcode, prefixes excluded
+    def __init__(self, sources, targets, kinds):
+        if np is None: raise ImportError('numpy is required by the xref index')
+        order = np.lexsort((sources, targets))
+        self.sources = np.asarray(sources, dtype=np.uint32)[order]
+        self.targets = np.asarray(targets, dtype=np.uint32)[order]
+        self.kinds = np.asarray(kinds, dtype=np.uint8)[order]
+        self._source_order = None
+
+    @classmethod
+    def from_pe(cls, pe, sections: list[SectionRange] = None):
+        if np is None: raise ImportError('numpy is required by the xref index')
+        if sections is None: sections = section_ranges(pe, '.text')
+        targets_ranges = code_ranges(pe)
+        image_size = pe.OPTIONAL_HEADER.SizeOfImage
+        image_base = None if pe.OPTIONAL_HEADER.Magic == 0x20b else pe.OPTIONAL_HEADER.ImageBase
+        res = [scan_section(pe, sect, targets_ranges, image_size, image_base) for sect in sections if sect.size >= 5]
+        if not res: return cls(np.zeros(0, np.uint32), np.zeros(0, np.uint32), np.zeros(0, np.uint8))
+        return cls(*(np.concatenate(arrays) for arrays in zip(*res)))
+
+    def arrays(self) -> dict[str, typing.Any]:
+        return {'sources': self.sources, 'targets': self.targets, 'kinds': self.kinds}
+
+    def __len__(self):
+        return len(self.targets)
+
+    def _select(self, index, kind: int | None):
+        if kind is not None: index = index[self.kinds[index] == kind]
+        return index
+
+    def refs_to(self, rva: int, kind: int = None) -> list[int]:
+        # source rva of the references to rva
+        return self.refs_to_range(rva, rva + 1, kind)
+
+    def refs_to_range(self, start: int, end: int, kind: int = None) -> list[int]:
+        # source rva of the references into [start, end), eg. the fields of a global
+        index = np.arange(*np.searchsorted(self.targets, (start, end)))
+        return self.sources[self._select(index, kind)].tolist()
+
+    def callers(self, rva: int) -> list[int]:
+        return self.refs_to(rva, CALL)
+
+    def refs_from(self, start: int, end: int, kind: int = None) -> list[tuple[int, int, int]]:
+        # (source, target, kind) of the references made by the code in [start, end), sorted by source
+        if self._source_order is None:
+            self._source_order = np.argsort(self.sources, kind='stable')
+        sources = self.sources[self._source_order]
+        index = self._select(self._source_order[np.arange(*np.searchsorted(sources, (start, end)))], kind)
+        return list(zip(self.sources[index].tolist(), self.targets[index].tolist(), self.kinds[index].tolist()))
@@ -1,10 +1,12 @@
-from setuptools import setup
+from setuptools import setup, find_packages
 
 setup(
     name='Farsa',
     version='0.1',
-    packages=['farsa'],
+    packages=find_packages(),
     install_requires=['pefile~=2021.9.3', ],
+    extras_require={'numpy': ['numpy']},
+    entry_points={'console_scripts': ['farsa-manifest = farsa.manifest:main']},
     url='https://github.com/nyaoouo/Farsa',
     license='GPLv3',
     author='Nyaoouo',
@@ -0,0 +1,53 @@
+# search_many against one search_from_text per signature, run with python tests/bench_pattern.py
+import os
+import random
+import time
+
+from farsa.pefile import PE
+from farsa.pattern import StaticPatternSearcher, MemoryPatternSearcher
+from farsa.utils.source import BufferSource
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+BASE = 0x180000000
+
+
+def make_sigs(data: bytes, count: int):
+    rng = random.Random(1)
+    res = {}
+    for k in range(count):
+        pos = rng.randrange(len(data) - 20)
+        tokens = ['??' if rng.random() < 0.2 else f'{data[pos + j]:02X}' for j in range(rng.randint(6, 16))]
+        res[f's{k}'] = ' '.join(tokens)
+    return res
+
+
+def best_of(func, repeat=5):
+    res = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        res = min(res, time.perf_counter() - start)
+    return res
+
+
+def compare(name: str, searcher, sigs: dict[str, str]):
+    separate = best_of(lambda: {key: searcher.search_from_text(sig) for key, sig in sigs.items()})
+    many = best_of(lambda: searcher.search_many(sigs))
+    assert searcher.search_many(sigs) == {key: searcher.search_from_text(sig) for key, sig in sigs.items()}
+    print(f'{name:8} {len(sigs):4} sigs  separate {separate * 1000:8.2f} ms  search_many {many * 1000:8.2f} ms  x{separate / many:.2f}')
+
+
+def main():
+    pe = PE(DLL_PATH, fast_load=True)
+    text = next(sect for sect in pe.sections if sect.Name.rstrip(b'\0') == b'.text')
+    data = text.get_data()
+    for count in (10, 100):
+        sigs = make_sigs(data, count)
+        compare('static', StaticPatternSearcher(pe, BASE), sigs)
+        source = BufferSource(data, BASE + text.VirtualAddress, 0x20)  # PAGE_EXECUTE_READ
+        compare('memory', MemoryPatternSearcher(source, chunk_size=0x10000), sigs)
+    pe.close()
+
+
+if __name__ == '__main__':
+    main()
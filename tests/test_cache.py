@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from farsa.cache import ModuleCache
+from farsa.pefile import PE
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+def test_sig_round_trip(pe, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    assert cache.get_sig('48 89 5C 24') is None
+    cache.set_sig('48 89 5C 24', [(0x1000, [4]), (0x2000, [])])
+    cache.save()
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    assert cache.get_sig('48 89 5c  24 ') == [(0x1000, [4]), (0x2000, [])]  # spaces and case do not matter
+    assert ModuleCache(pe, 'other.dll', str(tmp_path)).get_sig('48 89 5C 24') is None
+
+
+def test_sig_scope(pe, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    cache.set_sig('CC', [(1, [])])
+    cache.set_sig('CC', [(2, [])], '.rdata:00000000')
+    assert cache.get_sig('CC') == [(1, [])]
+    assert cache.get_sig('CC', '.rdata:00000000') == [(2, [])]
+    assert cache.get_sig('CC', '.data:00000000') is None
+
+
+def test_identity_change(pe, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    cache.set_sig('CC', [(1, [])])
+    cache.save()
+    time_date_stamp = pe.FILE_HEADER.TimeDateStamp
+    pe.FILE_HEADER.TimeDateStamp = time_date_stamp + 1  # a rebuild of the module
+    try:
+        assert ModuleCache(pe, 'EasyHook64.dll', str(tmp_path)).get_sig('CC') is None
+    finally:
+        pe.FILE_HEADER.TimeDateStamp = time_date_stamp
+
+
+def test_corrupt_file(pe, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    with open(cache.path(cache.sig_file_name), 'w') as f:
+        f.write('{')
+    assert cache.get_sig('CC') is None
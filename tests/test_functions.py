@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from farsa.functions import FunctionIndex
+from farsa.pefile import PE
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+@pytest.fixture(scope='module')
+def functions(pe):
+    return FunctionIndex.from_pe(pe)
+
+
+def test_same_as_pefile(functions):
+    pe = PE(DLL_PATH, fast_load=True)
+    try:
+        pe.parse_data_directories(directories=[3])
+        entries = sorted((e.struct.BeginAddress, e.struct.EndAddress) for e in pe.DIRECTORY_ENTRY_EXCEPTION)
+    finally:
+        pe.close()
+    assert list(zip(functions.begins, functions.ends)) == entries
+
+
+def test_find(functions):
+    assert functions.find(5949) == (5948, 6100)
+    assert functions.find(5948) == (5948, 6100)
+    assert functions.find(6100) != (5948, 6100)
+    assert functions.find(0) is None
+    assert functions.function_start(5949) == 5948
+    assert functions.function_start(0) is None
+
+
+def test_chained(functions):
+    chained = [i for i in range(len(functions)) if functions.parent(i) != functions.begins[i]]
+    assert len(chained) == 69
+    assert functions.function_start(78868) == functions.function_start(78924) == 78784
+    for i in chained:
+        start = functions.function_start(functions.begins[i])
+        assert start == functions.function_start(functions.parent(i))
+        assert functions.parent(functions.index(start)) == start
+
+
+def test_after_close():
+    pe = PE(DLL_PATH, fast_load=True)
+    functions = FunctionIndex.from_pe(pe)
+    pe.close()
+    assert functions.function_start(78868) == 78784
@@ -0,0 +1,88 @@
+import ctypes
+
+import pytest
+
+from farsa.utils.source import MemorySource, MemoryAccessError
+from farsa.struct_.base import MemStruct, Enum, Enumerate, field, bit_mask, init_mem_struct, init_enum
+
+np = pytest.importorskip('numpy')
+
+from farsa.scanner.instance import StructScanner, Between, OneOf, ValidPointer, Custom
+
+
+@init_enum
+class Kind(Enum):
+    PLAYER = Enumerate(1)
+    MONSTER = Enumerate(2)
+
+
+@init_mem_struct
+class Entity(MemStruct):
+    vtable = field(ctypes.c_void_p, 0)
+    hp = field(ctypes.c_int32, 8)
+    max_hp = field(ctypes.c_int32, 0xc)
+    target = field(ctypes.c_void_p, 0x10)
+    flags = field(bit_mask(ctypes.c_uint8, 3), 0x18, 2)
+    kind = field(Kind, 0x1c)
+
+
+class BuffersSource(MemorySource):
+    # readable buffers at {base: bytearray}, reads out of one buffer fail
+    def __init__(self, buffers: dict[int, bytearray]):
+        self.buffers = buffers
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        for base, data in self.buffers.items():
+            if base <= address and address + len(view) <= base + len(data):
+                view[:] = data[address - base:address - base + len(view)]
+                return
+        raise MemoryAccessError(address, len(view), 'read_into', 299)
+
+    def write(self, address: int, data) -> None:
+        raise MemoryAccessError(address, len(data), 'write', 5)
+
+    def query_regions(self, start: int = 0, end: int = None):
+        for base, data in sorted(self.buffers.items()):
+            if base + len(data) > start and (end is None or base < end):
+                yield base, len(data), 1
+
+
+class BufferScanner(StructScanner):
+    def __init__(self, buffers: dict[int, bytearray], *args, **kwargs):
+        super().__init__(BuffersSource(buffers), *args, protect=1, **kwargs)
+
+
+def put(data: bytearray, offset: int, **kwargs):
+    entity = Entity(**{'hp': 50, 'max_hp': 100, 'target': 0, 'flags': 3, 'kind': 'PLAYER', **kwargs})
+    data[offset:offset + ctypes.sizeof(Entity)] = bytes(entity)
+
+
+def test_find():
+    data = bytearray(0x1000)
+    put(data, 0x40)
+    put(data, 0x80, hp=0)
+    put(data, 0xc0, target=0x7fff0000)
+    put(data, 0x100, kind='MONSTER')
+    put(data, 0x140, flags=1)
+    put(data, 0x180, target=0x10010)
+    put(data, 0x1c4)  # not aligned
+    put(data, 0x1000 - ctypes.sizeof(Entity))
+    scanner = BufferScanner({0x10000: data}, Entity, {
+        'max_hp': 100,
+        'hp': Between(1, 100),
+        'target': ValidPointer(nullable=True),
+        'kind': OneOf(['PLAYER']),
+        'flags': 3,
+    }, chunk_size=0x100)
+    assert scanner.find().tolist() == [0x10040, 0x10180, 0x11000 - ctypes.sizeof(Entity)]
+
+
+def test_custom():
+    data = bytearray(0x200)
+    put(data, 0x40, hp=10)
+    put(data, 0x80, hp=11)
+    scanner = BufferScanner({0x10000: data}, Entity, {'max_hp': 100, 'hp': Custom(lambda values: values % 2 == 1)})
+    assert scanner.find().tolist() == [0x10080]
+    scanner = BufferScanner({0x10000: data}, Entity, {'max_hp': 100, 'hp': lambda values: values > 10}, alignment=4)
+    assert scanner.find().tolist() == [0x10080]
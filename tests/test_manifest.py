@@ -0,0 +1,35 @@
+import json
+import os
+import shutil
+
+from farsa import manifest
+
+RES_DIR = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res')
+PATTERNS = {'unique': '48 85 C9 74 37', 'ambiguous': 'CC CC', 'missing': 'CC 90 CC 90 CC 90 CC 90'}
+
+
+def test_resolve_file():
+    row = manifest.resolve_file(os.path.join(RES_DIR, 'EasyHook64.dll'), dict(PATTERNS, call='E8 * * * * 48 83 63 28'))
+    results = row['results']
+    assert results['unique'] == {'status': manifest.UNIQUE, 'rva': 0x1a20, 'points': []}
+    assert results['ambiguous'] == {'status': manifest.AMBIGUOUS}
+    assert results['missing'] == {'status': manifest.MISSING}
+    assert results['call']['status'] == manifest.UNIQUE and results['call']['points'] == [0x1a20]
+
+
+def test_main(tmp_path, capsys):
+    builds = tmp_path / 'builds'
+    builds.mkdir()
+    shutil.copy(os.path.join(RES_DIR, 'EasyHook64.dll'), builds / 'a.dll')
+    shutil.copy(os.path.join(RES_DIR, 'EasyHook64.dll'), builds / 'b.dll')
+    (builds / 'c.dll').write_bytes(b'MZ not a pe')
+    (builds / 'notes.txt').write_text('skipped by the glob')
+    (tmp_path / 'sigs.json').write_text(json.dumps(PATTERNS))
+    output = tmp_path / 'out.jsonl'
+    manifest.main([str(tmp_path / 'sigs.json'), str(builds), '-g', '*.dll', '-o', str(output), '-j', '2'])
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [os.path.basename(row['file']) for row in rows] == ['a.dll', 'b.dll', 'c.dll']
+    assert rows[0]['results'] == rows[1]['results']
+    assert rows[0]['results']['unique']['rva'] == 0x1a20
+    assert 'error' in rows[2]
+    assert capsys.readouterr().err.strip() == 'unique: 2, ambiguous: 2, missing: 2, error: 1'
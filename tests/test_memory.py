@@ -0,0 +1,173 @@
+import ctypes
+import os
+import sys
+import threading
+
+import pytest
+
+from farsa.utils import memory
+from farsa.utils.source import BufferSource, PageCacheSource, ProcessVmSource, buffer_address
+
+
+class CountingSource(BufferSource):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def read_into(self, address, buf):
+        self.reads += 1
+        return super().read_into(address, buf)
+
+
+def test_read_many():
+    data = bytearray(range(256)) * 16
+    source = CountingSource(data, 0x10000)
+    requests = [(0x10000 + i * 24, 4) for i in range(100)][::-1] + [(0x10ffe, 4), (0x20000, 2), (0x10010, 2)]
+    res = memory.read_many(source, requests)
+    for (address, size), view in zip(requests, res):
+        if address < 0x10000 or address + size > 0x11000:
+            assert view is None, hex(address)
+        else:
+            assert isinstance(view, memoryview)
+            assert bytes(view) == data[address - 0x10000:address - 0x10000 + size], hex(address)
+    assert source.reads == 3  # the near ranges merged, the two unreadable ones alone
+
+
+def test_read_many_retries_merged_failures():
+    # the merged read of the two requests runs past the end of the source, each one is read again alone
+    source = BufferSource(bytearray(range(16)), 0x1000)
+    assert [bytes(v) if v is not None else None for v in memory.read_many(source, [(0x100c, 4), (0x1010, 4)])] == [bytes(range(12, 16)), None]
+
+
+
+def test_read_string_safe_stops_at_unreadable_page():
+    data = bytearray(0x2000)
+    data[0x1ff8:] = b'z' * 8  # no terminator before the end of the readable memory
+    data[0xff0:0x1018] = b'y' * 40  # crosses a page
+    source = CountingSource(data, 0x10000)
+    assert memory.read_string_safe(source, 0x11ff8) == 'z' * 8
+    assert memory.read_string_safe(source, 0x10ff0) == 'y' * 40
+    assert memory.read_string_safe(source, 0x5) == ''
+    source.reads = 0
+    assert memory.read_string_safe(source, 0x10ff0, 8) == 'y' * 8
+    assert source.reads == 1
+
+
+def test_read_string_safe_utf16():
+    data = bytearray(0x2000)
+    text = 'hello wörld'.encode('utf-16-le')
+    data[0xff1:0xff1 + len(text)] = text  # odd address, crosses a page
+    data[0x100:0x108] = b'A\0\0\1B\0\0\0'  # nul bytes not aligned to a char
+    source = BufferSource(data)
+    assert memory.read_string_safe(source, 0xff1, encoding='utf-16-le') == 'hello wörld'
+    assert memory.read_string_safe(source, 0x100, encoding='utf-16-le') == 'AĀB'
+
+
+def test_read_strings_safe():
+    data = bytearray(0x1000)
+    data[0x100:0x105] = b'first'
+    data[0x200:0x206] = b'second'
+    data[0:8] = (0x100).to_bytes(8, 'little')
+    data[16:24] = (0x200).to_bytes(8, 'little')
+    source = BufferSource(data)
+    assert memory.read_strings_safe(source, [0x100, 0, 0x200, 0x5000]) == ['first', '', 'second', '']
+    assert memory.read_strings_safe(source, [0, 8, 16], pointers=True) == ['first', '', 'second']
+
+
+
+def test_page_cache():
+    data = bytearray(range(256)) * 64
+    source = CountingSource(data, 0)
+    cache = PageCacheSource(source, max_bytes=0x2000)
+    assert cache.read(0xffc, 8) == data[0xffc:0x1004]
+    reads = source.reads
+    assert cache.read(0xffe, 4) == data[0xffe:0x1002]
+    assert source.reads == reads
+    cache.write(0x1000, b'\xff')
+    assert cache.read(0x1000, 1) == b'\xff'
+    data[0xffc] = 0
+    assert cache.read(0xffc, 1) != b'\0'
+    cache.tick()
+    assert cache.read(0xffc, 1) == b'\0'
+
+
+def test_page_cache_ttl_and_batch():
+    data = bytearray(0x4000)
+    source = CountingSource(data, 0x10000)
+    cache = PageCacheSource(source, ttl=60)
+    bufs = [bytearray(4), bytearray(4), bytearray(4)]
+    assert cache.read_batch([(0x10010, bufs[0]), (0x12010, bufs[1]), (0x20000, bufs[2])]) == [True, True, False]
+    reads = source.reads
+    assert cache.read(0x12ffc, 4) == data[0x2ffc:0x3000]
+    assert source.reads == reads
+    cache.ttl = 0
+    cache.read(0x12ffc, 4)
+    assert source.reads > reads
+
+
+def test_read_into():
+    data = bytearray(range(256))
+    source = BufferSource(data, 0x1000)
+    buf = bytearray(8)
+    assert memory.read_into(source, 0x1010, buf) is buf and buf == data[0x10:0x18]
+    view = memoryview(bytearray(16))[4:12]
+    memory.read_into(source, 0x1020, view)
+    assert view.obj[4:12] == data[0x20:0x28]
+    value = memory.read_into(source, 0x1004, ctypes.c_uint32())
+    assert value.value == int.from_bytes(data[4:8], 'little')
+    assert memory.read_uint16(source, 0x1002) == 0x0302
+    assert memory.read_scratch(source, 0x1000, 4) == data[:4]
+    np = pytest.importorskip('numpy')
+    arr = np.zeros(4, np.uint16)
+    memory.read_into(source, 0x1000, arr)
+    assert arr.tolist() == [0x0100, 0x0302, 0x0504, 0x0706]
+
+
+def test_buffer_address():
+    value = ctypes.c_uint64()
+    assert buffer_address(value) == (ctypes.addressof(value), 8)
+    buf = bytearray(5)
+    assert buffer_address(buf)[1] == 5
+    np = pytest.importorskip('numpy')
+    arr = np.zeros(4, np.uint32)
+    assert buffer_address(arr) == (arr.ctypes.data, 16)
+    assert buffer_address(arr[1:]) == (arr.ctypes.data + 4, 12)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='linux sources')
+def test_read_into_self_process():
+    source = ProcessVmSource(os.getpid())
+    values = (ctypes.c_uint32 * 4)(1, 2, 3, 4)
+    out = (ctypes.c_uint32 * 4)()
+    memory.read_into(source, ctypes.addressof(values), out)
+    assert list(out) == [1, 2, 3, 4]
+    assert memory.read_uint32(source, ctypes.addressof(values) + 8) == 3
+
+
+def test_scratch_per_thread():
+    res = {}
+
+    def run(name):
+        res[name] = memory.scratch(ctypes.c_uint32)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert res[0] is not res[1]
+    assert memory.scratch(ctypes.c_uint32) is memory.scratch(ctypes.c_uint32)
+    assert len(memory.scratch_bytes(0x2000)) == 0x2000
+
+
+def test_page_cache_small_budget():
+    data = bytearray(range(256)) * 48
+    cache = PageCacheSource(BufferSource(data), max_bytes=0x1000)
+    assert cache.read(0xffe, 4) == data[0xffe:0x1002]
+    assert cache.read(0x1ffe, 4) == data[0x1ffe:0x2002]
+
+
+def test_iter_region_chunks():
+    source = BufferSource(bytes(range(256)) * 4, base=0x1001)
+    chunks = list(memory.iter_region_chunks(source, 0x1002, 0x1300, chunk_size=0x100, alignment=4, overlap=3))
+    assert [(address, limit) for address, data, limit in chunks] == [(0x1004, 0x1104), (0x1104, 0x1204), (0x1204, 0x1300)]
+    assert [len(data) for address, data, limit in chunks] == [0x103, 0x103, 0xfc]
+    assert bytes(chunks[1][1][:2]) == bytes([3, 4])
@@ -0,0 +1,217 @@
+import ctypes
+import os
+import random
+import sys
+import re
+
+import pytest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from farsa.pefile import PE
+from farsa.pattern import StaticPatternSearcher, MemoryPatternSearcher, sig_to_pattern, sig_anchor, sig_scan_anchor, iter_pattern, MaskedPattern, \
+    section_ranges, section_scope, SCN_MEM_EXECUTE, SCN_MEM_WRITE
+from farsa.utils import memory
+from farsa.utils.source import BufferSource, ProcessVmSource
+from farsa.winapi import structure
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+BASE = 0x180000000
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+@pytest.fixture(scope='module')
+def text(pe):
+    return next(sect for sect in pe.sections if sect.Name.rstrip(b'\0') == b'.text')
+
+
+@pytest.fixture(scope='module')
+def sigs(text):
+    # signatures cut out of .text with some wildcards / jumps, plus a few with many matches
+    data = text.get_data()
+    rng = random.Random(1)
+    res = {}
+    for k in range(80):
+        pos = rng.randrange(len(data) - 20)
+        tokens = ['??' if rng.random() < 0.2 else f'{data[pos + j]:02X}' for j in range(rng.randint(2, 10))]
+        if len(tokens) > 5 and rng.random() < 0.3: tokens[2:6] = ['*'] * 4
+        res[f's{k}'] = ' '.join(tokens)
+    res.update(dup1='48 89 5C 24', dup2='48 89 5C 24', wild='?? 48 89', cc='CC CC', ccc='CC CC CC')
+    return res
+
+
+def finditer(text, sig):
+    # matches of a plain re.finditer over the section
+    pattern, offsets = sig_to_pattern(sig)
+    return [
+        (match.start() + text.VirtualAddress + BASE, [int.from_bytes(g, 'little', signed=True) + offsets[i] for i, g in enumerate(match.groups())])
+        for match in re.finditer(pattern, text.get_data())
+    ]
+
+
+class CountingSource(BufferSource):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def read_into(self, address, buf):
+        self.reads += 1
+        return super().read_into(address, buf)
+
+
+def test_search_from_text(pe, text, sigs):
+    searcher = StaticPatternSearcher(pe, BASE)
+    for name, sig in sigs.items():
+        assert searcher.search_from_text(sig) == finditer(text, sig), name
+
+
+def test_search_many(pe, text, sigs):
+    searcher = StaticPatternSearcher(pe, BASE)
+    res = searcher.search_many(sigs)
+    for name, sig in sigs.items():
+        assert res[name] == finditer(text, sig), name
+    for limit in (0, 1, 2):
+        res = searcher.search_many(sigs, limit=limit)
+        for name, sig in sigs.items():
+            assert res[name] == finditer(text, sig)[:limit], (name, limit)
+
+
+def test_iter_many(pe, text, sigs):
+    sigs = dict(sigs, groups='48 8D 0D * * * *', groups2='E8 * * * * 48')
+    res = list(StaticPatternSearcher(pe, BASE).iter_many(sigs))
+    assert [address for name, address, offsets in res] == sorted(address for name, address, offsets in res)
+    for name, sig in sigs.items():
+        assert [(address, offsets) for _name, address, offsets in res if _name == name] == finditer(text, sig), name
+
+
+def test_find_first(pe, text, sigs):
+    searcher = StaticPatternSearcher(pe, BASE)
+    for name, sig in sigs.items():
+        assert searcher.find_first(sig) == next(iter(finditer(text, sig)), None), name
+    assert searcher.find_first('CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC CC') is None
+
+
+def test_sig_anchor():
+    assert sig_anchor('48 8B ?? 05 11 22 * * * * 33') == (3, bytes.fromhex('051122'))
+    assert sig_anchor('?? 48 89') == (1, bytes.fromhex('4889'))
+    assert sig_anchor('?? ??') == (0, b'')
+
+
+def test_iter_pattern_anchor(text, sigs):
+    data = text.get_data()
+    for name, sig in sigs.items():
+        pattern = re.compile(sig_to_pattern(sig)[0])
+        expected = [match.span() for match in pattern.finditer(data)]
+        assert [match.span() for match in iter_pattern(pattern, data, anchor=sig_anchor(sig))] == expected, name
+
+
+def test_numpy_engine(pe, text, sigs):
+    pytest.importorskip('numpy')
+    searcher = StaticPatternSearcher(pe, BASE, engine='numpy')
+    for name, sig in sigs.items():
+        assert searcher.search_from_text(sig) == finditer(text, sig), name
+    assert searcher.search_many(sigs) == {name: finditer(text, sig) for name, sig in sigs.items()}
+
+
+def test_sections(pe, text, sigs):
+    name = 'PrivIsDllSynchronizationHeld'
+    sig = ' '.join(f'{b:02X}' for b in name.encode())
+    rdata = next(sect for sect in pe.sections if sect.Name.rstrip(b'\0') == b'.rdata')
+    address = rdata.get_data().find(name.encode()) + rdata.VirtualAddress + BASE
+    assert StaticPatternSearcher(pe, BASE).find_address(sig) == []
+    assert StaticPatternSearcher(pe, BASE, sections='.rdata').find_address(sig) == [address]
+    assert StaticPatternSearcher(pe, BASE, sections=('.text', '.r*')).find_address(sig) == [address]
+    executable = StaticPatternSearcher(pe, BASE, characteristics=SCN_MEM_EXECUTE)
+    assert [sect.name for sect in executable.sections] == ['.text']
+    for name, sig in list(sigs.items())[:10]:
+        assert executable.search_from_text(sig) == finditer(text, sig), name
+    assert [sect.name for sect in section_ranges(pe, '.*data', SCN_MEM_WRITE)] == ['.data']
+
+
+def test_section_scope():
+    assert section_scope() == ''
+    assert section_scope('.text') != section_scope('.text*')
+    assert section_scope(characteristics=SCN_MEM_EXECUTE) != section_scope('*')
+
+
+def test_workers(pe, text, sigs):
+    searcher = StaticPatternSearcher(pe, BASE, file_path=DLL_PATH, workers=2, chunk_size=0x1000)
+    try:
+        res = searcher.search_many(sigs)
+        for name, sig in list(sigs.items())[:20]:
+            assert searcher.search_from_text(sig) == finditer(text, sig), name
+        for name, sig in sigs.items():
+            assert res[name] == finditer(text, sig), name
+    finally:
+        searcher.close()
+
+
+def test_nibble_wildcards():
+    data = bytes.fromhex('4c8bc1 488bc1 498bc9 4a8b00')
+    pattern = re.compile(sig_to_pattern('4? 8B ?1')[0])
+    assert [match.start() for match in pattern.finditer(data)] == [0, 3]
+    if np is not None:
+        assert [match.start() for match in MaskedPattern('4? 8B ?1').finditer(data)] == [0, 3]
+
+
+def test_memory_match_straddles_chunks():
+    data = bytearray(0x3000)
+    data[0x1ffe:0x2004] = bytes.fromhex('488b05112233')
+    source = BufferSource(data, 0x400000, structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value)
+    searcher = MemoryPatternSearcher(source, chunk_size=0x2000)
+    assert searcher.search_from_text('48 8b 05 * * * *') == [(0x401ffe, [0x332211 + 7])]
+    assert searcher.find_address('48 8b 05 11 22 33') == [0x401ffe]
+    assert searcher.search_many({'a': '48 8b 05 11', 'b': '22 33'}) == {'a': [(0x401ffe, [])], 'b': [(0x402002, [])]}
+
+
+def test_memory_find_first_stops_early():
+    data = bytearray(0x10000)
+    data[0x10:0x14] = data[0x8010:0x8014] = b'\x90\x90\xc3\xcc'
+    source = CountingSource(data, 0x400000, structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value)
+    searcher = MemoryPatternSearcher(source, chunk_size=0x1000)
+    assert searcher.find_first('90 90 C3') == (0x400010, [])
+    assert source.reads == 1
+    assert searcher.find_address_many({'a': '90 90 C3', 'b': 'C3 CC'}, limit=1) == {'a': [0x400010], 'b': [0x400012]}
+    assert source.reads == 2
+
+
+def test_memory_protect():
+    source = BufferSource(b'\x90\x90\xc3' * 4, 0x400000)  # read write, not executable
+    assert MemoryPatternSearcher(source).find_address('90 90 C3') == []
+    assert MemoryPatternSearcher(source, protect=memory.READABLE_PROTECT).find_address('90 90 C3') == [0x400000, 0x400003, 0x400006, 0x400009]
+
+
+def test_memory_workers_need_reopen():
+    with pytest.raises(ValueError):
+        MemoryPatternSearcher(BufferSource(b'\x90' * 0x100), workers=2)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='process_vm_readv')
+def test_memory_workers():
+    data = bytes(random.Random(1).randbytes(0x3000)) + b'\xde\xad\xbe\xef\x13\x37' + bytes(0x100)
+    buf = ctypes.create_string_buffer(data, len(data))
+    address = ctypes.addressof(buf)
+    searcher = MemoryPatternSearcher(
+        ProcessVmSource(os.getpid()), address, address + len(data), chunk_size=0x1000, protect=memory.READABLE_PROTECT, workers=2
+    )
+    try:
+        assert searcher.find_address('DE AD BE EF ?? 37') == [address + 0x3000]
+    finally:
+        searcher.close()
+
+
+def test_sig_scan_anchor():
+    assert sig_scan_anchor('48 8B 05 ?? 11 22') is None
+    assert sig_scan_anchor('48 8B ?? 05 11 22 33') == (3, bytes.fromhex('05112233'))
+    assert sig_scan_anchor('?? 48 89') == (1, bytes.fromhex('4889'))
+    assert sig_scan_anchor('E8 ?? ?? ?? ?? 90') is None
+    assert sig_scan_anchor('?? 48') is None
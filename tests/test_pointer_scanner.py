@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from farsa.scanner.pointer import PointerMap, Chain, compare_chains
+
+MODULE = 0x140000000
+
+
+def build(heap1: int, heap2: int):
+    # game.exe+0x100 -> heap1, heap1+0x18 -> heap2, the target is heap2+0x40
+    module = bytearray(0x1000)
+    module[0x100:0x108] = heap1.to_bytes(8, 'little')
+    module[0x200:0x208] = (MODULE + 0x300).to_bytes(8, 'little')  # points into the module itself
+    first = bytearray(0x1000)
+    first[0x18:0x20] = heap2.to_bytes(8, 'little')
+    first[0x20:0x28] = (0x7fff0000).to_bytes(8, 'little')  # points to unmapped memory
+    chunks = [(MODULE, bytes(module)), (heap1, bytes(first)), (heap2, bytes(0x1000))]
+    regions = [(MODULE, MODULE + 0x1000), (heap1, heap1 + 0x1000), (heap2, heap2 + 0x1000)]
+    return PointerMap.from_chunks(chunks, regions, [('game.exe', MODULE, 0x1000)])
+
+
+def test_find_chains():
+    pointers = build(0x20000000, 0x30000000)
+    assert len(pointers) == 3
+    assert pointers.value_at(0x20000018) == 0x30000000
+    assert pointers.value_at(0x20000020) is None
+    chain = Chain('game.exe', 0x100, (0x18, 0x40))
+    assert pointers.find_chains(0x30000040, max_depth=1) == []
+    assert pointers.find_chains(0x30000040, max_depth=3) == [chain]
+    assert pointers.resolve(chain) == 0x30000040
+    assert pointers.resolve(Chain('other.dll', 0x100, (0x18, 0x40))) is None
+
+
+def test_save_load_workers(tmp_path):
+    pointers = build(0x20000000, 0x30000000)
+    pointers.save(str(tmp_path / 'map.npz'))
+    loaded = PointerMap.load(str(tmp_path / 'map.npz'))
+    assert loaded.module_names == ['game.exe']
+    assert loaded.find_chains(0x30000040, max_depth=3, workers=2) == [Chain('game.exe', 0x100, (0x18, 0x40))]
+
+
+def test_compare_chains():
+    chains = build(0x20000000, 0x30000000).find_chains(0x30000040, max_depth=3)
+    # the heap moved in the next session, the chain still leads to the target
+    assert compare_chains(chains, build(0x50000000, 0x60000000), 0x60000040) == chains
+    assert compare_chains(chains, build(0x50000000, 0x60000000), 0x30000040) == []
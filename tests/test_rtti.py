@@ -0,0 +1,37 @@
+import json
+import os
+
+import pytest
+
+from farsa.pefile import PE
+
+np = pytest.importorskip('numpy')
+
+from farsa.rtti import RttiIndex, RttiClass, demangle
+
+RES_DIR = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res')
+
+
+@pytest.mark.parametrize('name, vtables', [
+    ('EasyHook64.dll', (0x31208, 0x31230, 0x31240)),
+    ('EasyHook32.dll', (0x29fc8, 0x29fe4, 0x29fec)),
+])
+def test_from_pe(name, vtables):
+    pe = PE(os.path.join(RES_DIR, name), fast_load=True)
+    try:
+        rtti = RttiIndex.from_pe(pe)
+    finally:
+        pe.close()
+    bad_exception, type_info, exception = vtables
+    assert len(rtti) == 3
+    assert rtti.get(bad_exception) == RttiClass('std::bad_exception', '.?AVbad_exception@std@@', ['std::exception'], 0)
+    assert rtti.get(type_info).name == 'type_info'
+    assert rtti.find_vtables('std::exception') == [exception]
+    assert rtti.get(exception + 1) is None
+    loaded = RttiIndex.from_json(json.loads(json.dumps(rtti.to_json())))
+    assert loaded.classes == rtti.classes
+
+
+def test_demangle():
+    assert demangle('.?AVexception@std@@') == 'std::exception'
+    assert demangle('.?AUFoo@@') == 'Foo'
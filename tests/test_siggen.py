@@ -0,0 +1,63 @@
+import collections
+import os
+
+import pytest
+
+from farsa.pefile import PE
+from farsa.pattern import StaticPatternSearcher
+
+np = pytest.importorskip('numpy')
+
+from farsa.cache import ModuleCache
+from farsa.xref import CALL
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+BASE = 0x180000000
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+@pytest.fixture(scope='module')
+def searcher(pe):
+    return StaticPatternSearcher(pe, BASE)
+
+
+def test_make_sig(searcher):
+    xrefs = searcher.sig_maker.xrefs
+    targets = collections.Counter(xrefs.targets[xrefs.kinds == CALL].tolist())
+    for rva, count in targets.most_common(20):
+        sig = searcher.make_sig(BASE + rva)
+        assert searcher.find_address(sig) == [BASE + rva], hex(rva)
+        # the rel32 of the calls inside the signature are wildcarded
+        for source, target, kind in xrefs.refs_from(rva, rva + len(sig.split()) - 4, CALL):
+            assert sig.split()[source - rva + 1:source - rva + 5] == ['??'] * 4, hex(rva)
+    assert searcher.make_sig(BASE + 0x1a20) == '48 85 C9 74 37'
+
+
+def test_make_sig_not_unique(searcher):
+    sect = searcher.sections[0]
+    offset = searcher.pe.__data__.find(b'\xcc' * 16, sect.offset)
+    assert searcher.make_sig(BASE + offset - sect.offset + sect.virtual_address, 8) is None
+
+
+def test_make_ref_sig(pe, searcher):
+    rdata = next(sect for sect in pe.sections if sect.Name.rstrip(b'\0') == b'.rdata')
+    address = BASE + rdata.get_data().find(b'PrivIsDllSynchronizationHeld') + rdata.VirtualAddress
+    sig = searcher.make_ref_sig(address)
+    assert sig.count('*') == 4
+    assert searcher.find_point(sig) == [[address]]
+    sig = searcher.make_ref_sig(BASE + 0x1a20)
+    assert sig.startswith('E8 * * * *')
+    assert searcher.find_point(sig) == [[BASE + 0x1a20]]
+
+
+def test_cached_grams(pe, searcher, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    sig = StaticPatternSearcher(pe, BASE, cache=cache).make_sig(BASE + 0x3b70)
+    assert cache.load_arrays('grams.npz') is not None
+    assert StaticPatternSearcher(pe, BASE, cache=cache).make_sig(BASE + 0x3b70) == sig == searcher.make_sig(BASE + 0x3b70)
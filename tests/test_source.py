@@ -0,0 +1,56 @@
+import ctypes
+import os
+import sys
+
+import pytest
+
+from farsa.exception import WinAPIError, MemoryAccessError
+from farsa.utils import memory
+from farsa.utils.source import BufferSource, ProcessVmSource, ProcMemSource
+from farsa.winapi import structure
+
+linux = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='linux sources')
+
+
+@pytest.fixture(params=[
+    pytest.param(lambda: ProcessVmSource(os.getpid()), id='process_vm', marks=linux),
+    pytest.param(lambda: ProcMemSource(os.getpid()), id='proc_mem', marks=linux),
+])
+def source(request):
+    source = request.param()
+    yield source
+    source.close()
+
+
+def test_self_process(source):
+    # the sources of this process read and write its own memory
+    buf = ctypes.create_string_buffer(b'hello world', 32)
+    address = ctypes.addressof(buf)
+    assert source.read(address, 11) == b'hello world'
+    source.write(address + 6, b'there')
+    assert buf.value == b'hello there'
+    assert memory.read_memory(source, ctypes.c_char * 5, address).value == b'hello'
+    with pytest.raises(MemoryAccessError):
+        source.read(0x10, 4)
+    bufs = [bytearray(5), bytearray(4), bytearray(5)]
+    assert source.read_batch(zip([address, 0x10, address + 6], bufs)) == [True, False, True]
+    assert bufs[0] == b'hello' and bufs[2] == b'there'
+    assert source.write_batch([(address, b'HELLO'), (0x10, b'x')]) == [True, False]
+    assert buf.value == b'HELLO there'
+    base, size, protect = next(source.query_regions(address, address + 1))
+    assert base <= address < base + size
+    assert protect & memory.READABLE_PROTECT
+
+
+def test_buffer_source():
+    source = BufferSource(b'\0' * 0x100, 0x1000)
+    memory.write_bytes(source, 0x10f0, b'abcd')
+    assert memory.read_bytes(source, 0x10f0, 4) == b'abcd'
+    assert memory.read_uint32(source, 0x10f0) == int.from_bytes(b'abcd', 'little')
+    with pytest.raises(WinAPIError):
+        source.read(0x10fe, 4)
+    with pytest.raises(MemoryAccessError):
+        source.write(0xfff, b'x')
+    assert list(source.query_regions(0x1100)) == []
+    assert list(memory.iter_memory_region(source, 0, None, memory.READABLE_PROTECT)) == [(0x1000, 0x100)]
+    assert list(memory.iter_memory_region(source, 0, None, structure.MEMORY_PROTECTION.PAGE_EXECUTE_READ.value)) == []
@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from farsa.pefile import PE
+
+np = pytest.importorskip('numpy')
+
+from farsa.strings import StringIndex
+from farsa.xref import RIP, PTR
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+@pytest.fixture(scope='module')
+def strings(pe):
+    return StringIndex.from_pe(pe)
+
+
+def test_find(pe, strings):
+    assert strings.find('PrivIsDllSynchronizationHeld') == [136376]
+    assert pe.get_data(136376, 29) == b'PrivIsDllSynchronizationHeld\0'
+    assert (136456, True, 'ntdll.dll') in strings.strings
+    assert pe.get_data(136456, 20) == 'ntdll.dll\0'.encode('utf-16-le')
+    assert strings.find('no such string') == []
+    assert list(strings.iter_prefix('RtlCapture')) == ['RtlCaptureContext', 'RtlCaptureStackBackTrace']
+
+
+def test_refs(pe, strings):
+    assert strings.find_refs('PrivIsDllSynchronizationHeld') == strings.find_refs('PrivIsDllSynchronizationHeld', RIP) == [0x116f]
+    assert strings.find_refs('PrivIsDllSynchronizationHeld', PTR) == []
+    # a relocated pointer holds image base + rva of the string
+    rva = strings.find('ja-JP')[0]
+    sources = strings.refs_to(rva, PTR)
+    assert sources
+    for source in sources:
+        assert int.from_bytes(pe.get_data(source, 8), 'little') == pe.OPTIONAL_HEADER.ImageBase + rva
+
+
+def test_json_round_trip(strings):
+    loaded = StringIndex.from_json(json.loads(json.dumps(strings.to_json())))
+    assert loaded.strings == strings.strings
+    assert loaded.find_refs('ja-JP') == strings.find_refs('ja-JP')
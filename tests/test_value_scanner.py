@@ -0,0 +1,103 @@
+import ctypes
+
+import pytest
+
+from farsa.utils.source import BufferSource, MemoryAccessError, MemorySource
+
+np = pytest.importorskip('numpy')
+
+from farsa.scanner.value import ValueScanner, EXACT, RANGE, UNKNOWN, CHANGED, UNCHANGED, INCREASED, DECREASED
+
+
+class BuffersSource(MemorySource):
+    # readable buffers at {base: bytearray}, reads out of one buffer fail
+    def __init__(self, buffers: dict[int, bytearray]):
+        self.buffers = buffers
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        for base, data in self.buffers.items():
+            if base <= address and address + len(view) <= base + len(data):
+                view[:] = data[address - base:address - base + len(view)]
+                return
+        raise MemoryAccessError(address, len(view), 'read_into', 299)
+
+    def write(self, address: int, data) -> None:
+        raise MemoryAccessError(address, len(data), 'write', 5)
+
+    def query_regions(self, start: int = 0, end: int = None):
+        for base, data in sorted(self.buffers.items()):
+            if base + len(data) > start and (end is None or base < end):
+                yield base, len(data), 1
+
+
+class BufferScanner(ValueScanner):
+    def __init__(self, buffers: dict[int, bytearray], d_type, **kwargs):
+        super().__init__(BuffersSource(buffers), d_type, protect=1, **kwargs)
+
+
+def put(data: bytearray, offset: int, d_type, value):
+    data[offset:offset + ctypes.sizeof(d_type)] = bytes(d_type(value))
+
+
+def test_exact_then_next():
+    data = bytearray(0x1000)
+    for offset in (0x10, 0x20, 0x30): put(data, offset, ctypes.c_int32, 100)
+    scanner = BufferScanner({0x10000: data}, ctypes.c_int32, chunk_size=0x100)
+    assert scanner.first_scan(EXACT, 100) == 3
+    put(data, 0x10, ctypes.c_int32, 101)
+    put(data, 0x20, ctypes.c_int32, 99)
+    assert scanner.next_scan(UNCHANGED) == 1
+    assert scanner.results() == [(0x10030, 100)]
+    assert scanner.first_scan(RANGE, 99, 101) == 3
+    assert scanner.next_scan(INCREASED) == 0
+    scanner.first_scan(RANGE, 99, 101)
+    put(data, 0x30, ctypes.c_int32, -5)
+    assert scanner.next_scan(DECREASED) == 1
+    assert scanner.results() == [(0x10030, -5)]
+
+
+def test_next_scan_across_regions():
+    # both candidates in one chunk sized window, with unmapped memory between their regions
+    buffers = {0x10000: bytearray(0x100), 0x20000: bytearray(0x100)}
+    put(buffers[0x10000], 0x10, ctypes.c_uint32, 42)
+    put(buffers[0x20000], 0x20, ctypes.c_uint32, 42)
+    scanner = BufferScanner(buffers, ctypes.c_uint32)
+    assert scanner.first_scan(EXACT, 42) == 2
+    put(buffers[0x10000], 0x10, ctypes.c_uint32, 43)
+    assert scanner.next_scan(CHANGED) == 1
+    assert scanner.results() == [(0x10010, 43)]
+
+
+def test_unaligned_across_chunks():
+    data = bytearray(0x1000)
+    put(data, 0xff, ctypes.c_double, 1.5)  # straddles the first two chunks
+    scanner = BufferScanner({0x10000: data}, ctypes.c_double, alignment=1, chunk_size=0x100)
+    assert scanner.first_scan(EXACT, 1.5) == 1
+    assert scanner.results() == [(0x100ff, 1.5)]
+
+
+def test_unknown_scan():
+    data = bytearray(0x1000)
+    scanner = BufferScanner({0x10000: data}, ctypes.c_uint16, chunk_size=0x100)
+    assert scanner.first_scan(UNKNOWN) == 0x800
+    with pytest.raises(ValueError):
+        scanner.results()
+    put(data, 0xffe, ctypes.c_uint16, 7)
+    assert scanner.next_scan(CHANGED) == 1
+    assert scanner.results() == [(0x10ffe, 7)]
+
+
+def test_unreadable_candidates_dropped():
+    buffers = {0x10000: bytearray(0x100)}
+    put(buffers[0x10000], 0x40, ctypes.c_uint32, 5)
+    scanner = BufferScanner(buffers, ctypes.c_uint32)
+    assert scanner.first_scan(EXACT, 5) == 1
+    del buffers[0x10000]
+    assert scanner.next_scan(UNCHANGED) == 0
+
+
+def test_default_protect():
+    data = bytearray(0x100)
+    put(data, 0x20, ctypes.c_uint32, 42)
+    assert ValueScanner(BufferSource(data, 0x10000), ctypes.c_uint32).first_scan(EXACT, 42) == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from farsa.utils.source import BufferSource, MemoryAccessError, MemorySource
+
+np = pytest.importorskip('numpy')
+
+from farsa.scanner.vtable import VtableScanner
+
+VTABLE_A = 0x140010000
+VTABLE_B = 0x140010100
+
+
+class BuffersSource(MemorySource):
+    # readable buffers at {base: bytearray}, reads out of one buffer fail
+    def __init__(self, buffers: dict[int, bytearray]):
+        self.buffers = buffers
+
+    def read_into(self, address: int, buf) -> None:
+        view = memoryview(buf).cast('B')
+        for base, data in self.buffers.items():
+            if base <= address and address + len(view) <= base + len(data):
+                view[:] = data[address - base:address - base + len(view)]
+                return
+        raise MemoryAccessError(address, len(view), 'read_into', 299)
+
+    def write(self, address: int, data) -> None:
+        raise MemoryAccessError(address, len(data), 'write', 5)
+
+    def query_regions(self, start: int = 0, end: int = None):
+        for base, data in sorted(self.buffers.items()):
+            if base + len(data) > start and (end is None or base < end):
+                yield base, len(data), 1
+
+
+class BufferScanner(VtableScanner):
+    def __init__(self, buffers: dict[int, bytearray], **kwargs):
+        super().__init__(BuffersSource(buffers), protect=1, **kwargs)
+
+
+def put(buffers, address: int, value: int):
+    for base, data in buffers.items():
+        if base <= address < base + len(data):
+            data[address - base:address - base + 8] = value.to_bytes(8, 'little')
+
+
+def test_find():
+    buffers = {0x10000: bytearray(0x3000), 0x40000: bytearray(0x1000)}
+    for address in (0x10010, 0x11ff8, 0x12000, 0x40ff8): put(buffers, address, VTABLE_A)
+    put(buffers, 0x10020, VTABLE_B)
+    put(buffers, 0x10034, VTABLE_A)  # not pointer aligned
+    scanner = BufferScanner(buffers, chunk_size=0x1000)
+    assert scanner.find(VTABLE_A).tolist() == [0x10010, 0x11ff8, 0x12000, 0x40ff8]
+    assert scanner.find([VTABLE_A, VTABLE_B]).tolist() == [0x10010, 0x10020, 0x11ff8, 0x12000, 0x40ff8]
+    assert scanner.find_grouped([VTABLE_B, VTABLE_A, 0x140010200]) == {
+        VTABLE_B: [0x10020], VTABLE_A: [0x10010, 0x11ff8, 0x12000, 0x40ff8], 0x140010200: [],
+    }
+
+
+def test_range():
+    buffers = {0x10000: bytearray(0x3000)}
+    for address in (0x10010, 0x11000, 0x12ff8): put(buffers, address, VTABLE_A)
+    assert BufferScanner(buffers, start=0x10ffc, end=0x12ff8).find(VTABLE_A).tolist() == [0x11000]
+
+
+def test_default_protect():
+    buffers = {0x10000: bytearray(0x100)}
+    put(buffers, 0x10040, VTABLE_A)
+    assert VtableScanner(BufferSource(buffers[0x10000], 0x10000)).find(VTABLE_A).tolist() == [0x10040]
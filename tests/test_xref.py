@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from farsa.cache import ModuleCache
+from farsa.pefile import PE, DIRECTORY_ENTRY
+
+np = pytest.importorskip('numpy')
+
+from farsa.xref import XrefIndex, CALL, RIP
+
+DLL_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook64.dll')
+DLL32_PATH = os.path.join(os.path.dirname(__file__), '..', 'farsa', 'hook', 'res', 'EasyHook32.dll')
+
+
+@pytest.fixture(scope='module')
+def pe():
+    pe = PE(DLL_PATH, fast_load=True)
+    yield pe
+    pe.close()
+
+
+@pytest.fixture(scope='module')
+def xrefs(pe):
+    return XrefIndex.from_pe(pe)
+
+
+def rel32(pe, rva):
+    return int.from_bytes(pe.get_data(rva, 4), 'little', signed=True)
+
+
+def test_branches(pe, xrefs):
+    calls = xrefs.refs_to_range(0, pe.OPTIONAL_HEADER.SizeOfImage, CALL)
+    assert len(calls) > 1000
+    for source, target, kind in xrefs.refs_from(0, pe.OPTIONAL_HEADER.SizeOfImage):
+        if kind == RIP: continue
+        assert pe.get_data(source, 1)[0] == (0xe8 if kind == CALL else 0xe9)
+        assert target == source + 5 + rel32(pe, source + 1)
+
+
+def test_rip_lea(pe, xrefs):
+    # lea r64, [rip + disp32] decoded by hand
+    count = 0
+    for source, target, kind in xrefs.refs_from(0, pe.OPTIONAL_HEADER.SizeOfImage, RIP):
+        if pe.get_data(source - 1, 2) in (b'\x48\x8d', b'\x4c\x8d'):
+            assert target == source + 6 + rel32(pe, source + 2)
+            count += 1
+    assert count > 100
+
+
+def test_string_ref(pe, xrefs):
+    rdata = next(sect for sect in pe.sections if sect.Name.rstrip(b'\0') == b'.rdata')
+    rva = rdata.get_data().find(b'PrivIsDllSynchronizationHeld') + rdata.VirtualAddress
+    assert xrefs.refs_to(rva) == xrefs.refs_to(rva, RIP) == [0x116f]
+    assert xrefs.refs_to(rva, CALL) == []
+
+
+def test_callers(xrefs):
+    callers = xrefs.callers(0x1a20)
+    assert len(callers) == 189
+    assert callers == sorted(callers)
+    for source in callers[:20]:
+        assert (source, 0x1a20, CALL) in xrefs.refs_from(source, source + 1)
+    refs = xrefs.refs_from(0x1800, 0x1a20)
+    assert [source for source, target, kind in refs] == sorted(source for source, target, kind in refs)
+    assert all(source in xrefs.refs_to(target, kind) for source, target, kind in refs)
+
+
+def test_cache_arrays(pe, xrefs, tmp_path):
+    cache = ModuleCache(pe, 'EasyHook64.dll', str(tmp_path))
+    assert cache.load_arrays('xrefs.npz') is None
+    cache.save_arrays('xrefs.npz', xrefs.arrays())
+    loaded = XrefIndex(**ModuleCache(pe, 'EasyHook64.dll', str(tmp_path)).load_arrays('xrefs.npz'))
+    assert len(loaded) == len(xrefs)
+    assert loaded.callers(0x1a20) == xrefs.callers(0x1a20)
+
+
+def test_pe32_absolute_operands():
+    # mod 00 rm 101 is [disp32] on x86, every decoded operand is a relocated absolute address
+    pe = PE(DLL32_PATH, fast_load=True)
+    try:
+        pe.parse_data_directories(directories=[DIRECTORY_ENTRY['IMAGE_DIRECTORY_ENTRY_BASERELOC']])
+        relocs = {entry.rva for block in pe.DIRECTORY_ENTRY_BASERELOC for entry in block.entries if entry.type}
+        refs = XrefIndex.from_pe(pe).refs_from(0, pe.OPTIONAL_HEADER.SizeOfImage, RIP)
+        assert len(refs) > 1000
+        for source, target, kind in refs:
+            disp = source + (3 if pe.get_data(source, 1) == b'\x0f' else 2)
+            assert disp in relocs
+            assert target == int.from_bytes(pe.get_data(disp, 4), 'little') - pe.OPTIONAL_HEADER.ImageBase
+    finally:
+        pe.close()